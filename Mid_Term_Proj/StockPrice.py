@@ -1,12 +1,27 @@
 import streamlit as st
 import pandas as pd
-import base64
+import math
+import os
+import time
 import altair as alt
-import yfinance as yf
 import plotly.graph_objects as go
-import seaborn as sns
-import matplotlib.pyplot as plt
 from PIL import Image
+from backtest import crossover_grid, grid_summary
+from bulk_loader import load_bulk, yf_batch_downloader
+import constituents
+from correlation import CorrelationEngine, heatmap_figure
+from downsample import POINTS_PER_PIXEL, candle_budget, downsample, line_budget, ohlc_rule, resample_ohlc
+from export import FORMATS, MIME_TYPES, export_file, frame_chunks, price_chunks
+from figures import FigureCache, correlation_heatmap, sector_pie, volume_scatter
+from indicators import crossovers, rolling_means
+from instrumentation import ALWAYS_ON, METRICS_PATH, Registry, Trace
+from price_store import PriceRequests, PriceStore
+from sections import Sections
+from shared_cache import SharedCache, backend_from_env, download_complete, download_ttl
+from streaming import REFRESH_SECONDS, ReplaySource, Streamer, YahooSource
+from tables import DEFAULT_COLUMNS, DEFAULT_PAGE_ROWS, TableStore
+
+rerun_started = time.perf_counter()
 
 st.title('S&P 500 Stock Price Analysis - User Guide (by Arsh Ahtsham)')
 
@@ -58,108 +73,311 @@ st.markdown("""
 
 st.sidebar.header('User Input Features')
 
-# Web scraping of S&P 500 data
-@st.cache_data
-def load_data():
-    url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-    html = pd.read_html(url, header=0)
-    df = html[0]
-    return df
+# Timings, cache hits and payload sizes of this rerun, collected while the debug
+# panel at the bottom of the sidebar is switched on
+@st.cache_resource
+def get_metrics_registry():
+    return Registry()
+
+trace = Trace(get_metrics_registry(), enabled=st.session_state.get('debug_panel', False) or ALWAYS_ON)
+
+# Sector table, sector chart, price panel and analysis panel keep their results
+# between reruns and only recompute when their own inputs change
+sections = Sections(st.session_state, trace=trace)
 
-df = load_data()
-sector = df.groupby('GICS Sector')
+# Cache shared with every other session and replica, in front of Yahoo Finance
+# and Wikipedia: concurrent requests for the same data cause one fetch
+@st.cache_resource
+def get_shared_cache():
+    return SharedCache(backend_from_env())
+
+shared_cache = get_shared_cache()
+# Replicas share one scrape a day
+shared_scrape = shared_cache.memoize('constituents', constituents.scrape, ttl=24 * 3600)
+
+# S&P 500 constituents from the local snapshot; Wikipedia is only scraped to
+# create it or, in the background, to refresh it once it is a week old
+@st.cache_data
+def load_data(snapshot_mtime):
+    trace.miss('constituents')
+    return constituents.load_constituents(scraper=shared_scrape)
+
+snapshot_mtime = os.path.getmtime(constituents.SNAPSHOT_PATH) if os.path.exists(constituents.SNAPSHOT_PATH) else None
+try:
+    with trace.lookup('constituents'), trace.span('constituents', 'fetch'):
+        df, constituents_version = load_data(snapshot_mtime)
+except Exception as error:
+    # No snapshot and no way to scrape one (failures are not cached: the next rerun retries)
+    st.error(f'The list of S&P 500 companies could not be downloaded ({error}). Please try again later.')
+    st.stop()
+constituents.start_background_refresh(scraper=shared_scrape)
+st.sidebar.caption(f'Constituents as of {constituents_version}')
+if constituents.last_refresh.get('added') or constituents.last_refresh.get('removed'):
+    st.sidebar.caption(f"Latest refresh: added {', '.join(constituents.last_refresh['added']) or 'none'}; "
+                       f"removed {', '.join(constituents.last_refresh['removed']) or 'none'}")
+sector = df.groupby('GICS Sector', observed=True)
 
 # Sidebar - Sector selection
 sorted_sector_unique = sorted(df['GICS Sector'].unique())
 selected_sector = st.sidebar.multiselect('Select Sectors', sorted_sector_unique, sorted_sector_unique)
 
 # Filtering data based on selected sectors
-df_selected_sector = df[df['GICS Sector'].isin(selected_sector)]
+def filter_sectors():
+    selected = df[df['GICS Sector'].isin(selected_sector)]
+    # As plain strings: counts of a categorical would list unselected sectors with 0
+    counts = selected['GICS Sector'].astype(str).value_counts().reset_index()
+    counts.columns = ['Sector', 'Count']
+    return selected, counts
+
+df_selected_sector, sector_counts = sections.run('sector table', filter_sectors,
+                                                 inputs=(snapshot_mtime, tuple(selected_sector)))
+
+# Tables are shown a page at a time. Sorting, filtering and column selection run
+# on the server against a columnar copy, so only the visible rows are sent.
+def paged_table(name, store):
+    columns = store.columns
+    key = f'{name}_{abs(hash(tuple(columns)))}'
+    with st.expander('Sort, filter and choose columns'):
+        sort_column, order_column, filter_column, text_column = st.columns(4)
+        sort_by = sort_column.selectbox('Sort by', ['(none)'] + columns, key=key + '_sort')
+        descending = order_column.checkbox('Descending', key=key + '_descending')
+        filter_by = filter_column.selectbox('Filter column', columns, key=key + '_filter_column')
+        filter_text = text_column.text_input('Contains', key=key + '_filter_text')
+        shown = st.multiselect('Columns', columns, columns[:DEFAULT_COLUMNS], key=key + '_columns')
+    query = dict(sort_by=None if sort_by == '(none)' else sort_by, descending=descending,
+                 filter_column=filter_by, filter_text=filter_text)
+    pages = max(1, math.ceil(len(store.rows(**query)) / DEFAULT_PAGE_ROWS))
+    # A new query or result size starts again from the first page
+    page = st.number_input(f'Page (of {pages})', min_value=1, max_value=pages, value=1,
+                           key=f'{key}_page_{abs(hash((tuple(query.items()), pages)))}')
+    rows, total = store.page(page - 1, columns=shown, **query)
+    st.dataframe(trace.payload(name, rows), hide_index=True)
+    first = (page - 1) * DEFAULT_PAGE_ROWS
+    st.caption(f'Rows {min(first + 1, total)}-{first + len(rows)} of {total}')
 
 st.header('Display Companies in Selected Sectors')
 st.write(f'Data Dimension: {df_selected_sector.shape[0]} rows and {df_selected_sector.shape[1]} columns.')
-st.dataframe(df_selected_sector)
-
-# Download S&P500 data as CSV
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="SP500.csv">Download CSV File</a>'
-    return href
-
-st.markdown(filedownload(df_selected_sector), unsafe_allow_html=True)
+sector_table = sections.run('sector table store', lambda: TableStore(df_selected_sector), after=('sector table',))
+with sections.timed('sector table render'):
+    paged_table('sector table', sector_table)
+
+# Download S&P500 data. The file is only generated when asked for, written to
+# disk in chunks, handed to the browser on that one rerun and deleted again.
+def export_download(label, name, make_chunks):
+    export_format = st.selectbox(f'{label} file format', list(FORMATS), key=name + '_format')
+    if st.button(f'Prepare {label}', key=name + '_prepare'):
+        extension = FORMATS[export_format]
+        path = export_file(make_chunks(), name, export_format)
+        try:
+            with open(path, 'rb') as f:
+                st.download_button(f'Download {label}', f, file_name=name + extension, mime=MIME_TYPES[extension])
+        finally:
+            os.remove(path)
+
+export_download('Companies in Selected Sectors', 'SP500', lambda: frame_chunks(df_selected_sector))
 
 
 # Create a bar plot of sector distribution
 st.sidebar.subheader('Sector Distribution')
-sector_counts = df_selected_sector['GICS Sector'].value_counts().reset_index()
-sector_counts.columns = ['Sector', 'Count']
-
 chart_type = st.sidebar.selectbox("Select Chart Type", [ "Pie Chart","Bar Chart","Donut Chart"])
 
-# Create the selected chart
-if chart_type == "Bar Chart":
-    st.subheader('Bar Chart - Sector Distribution')
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x='Count', y='Sector', data=sector_counts, palette='viridis')
-    plt.xlabel('Number of Companies')
-    plt.ylabel('Sector')
-    plt.title('S&P 500 Sector Distribution')
-    st.pyplot(plt)
-
-elif chart_type == "Pie Chart":
-    st.subheader('Pie Chart - Sector Distribution')
-    plt.figure(figsize=(8, 8))
-    sns.set_palette('viridis')
-    plt.pie(sector_counts['Count'], labels=sector_counts['Sector'], autopct='%1.1f%%', startangle=140)
-    plt.axis('equal')
-    plt.title('S&P 500 Sector Distribution')
-    st.pyplot(plt)
-
-elif chart_type == "Donut Chart":
-    # Create a horizontal bar plot for sector distribution
-    plt.figure(figsize=(8, 8))
-    sns.set_palette('viridis')
-    plt.pie(sector_counts['Count'], labels=sector_counts['Sector'], autopct='%1.1f%%', startangle=140, pctdistance=0.85)
-    circle = plt.Circle((0, 0), 0.70, fc='white')
-    plt.gca().add_artist(circle)
-    plt.axis('equal')
-    plt.title('S&P 500 Sector Distribution')
-    st.pyplot(plt)
+# Create the selected chart. Pie and donut charts are rendered once per sector
+# selection and served from a shared cache of PNG bytes afterwards.
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
 
+figure_cache = get_figure_cache()
 
-# Stock data retrieval and visualization
-st.sidebar.subheader('Stock Visualization Options (Closing price)')
-start_date = st.sidebar.date_input('Start Date', pd.to_datetime('2023-01-01'))
-end_date = st.sidebar.date_input('End Date', pd.to_datetime('2023-12-31'))
+def cached_figure(chart_type, data, render):
+    with trace.lookup('figures'):
+        return figure_cache.get(chart_type, data, trace.missed('figures', render))
 
-selected_symbol = st.sidebar.selectbox('Select a Company', list(df_selected_sector['Symbol']))
-company_data = yf.download(selected_symbol, start=start_date, end=end_date)
+def sector_chart():
+    if chart_type == "Bar Chart":
+        return alt.Chart(sector_counts, title='S&P 500 Sector Distribution').mark_bar().encode(
+            x=alt.X('Count', title='Number of Companies'),
+            y=alt.Y('Sector', sort='-x'),
+            color=alt.Color('Sector', scale=alt.Scale(scheme='viridis'), legend=None))
+    elif chart_type == "Pie Chart":
+        return cached_figure('pie', sector_counts, sector_pie)
+    elif chart_type == "Donut Chart":
+        return cached_figure('donut', sector_counts, lambda data: sector_pie(data, donut=True))
 
-st.header('Stock Closing Price for ' + selected_symbol)
-st.write(f'Data for {selected_symbol} from {start_date} to {end_date}')
-st.line_chart(company_data['Close'])
+chart = sections.run('sector chart', sector_chart, inputs=(chart_type,), after=('sector table',))
 
-#######################
+with sections.timed('sector chart render'):
+    if chart_type == "Bar Chart":
+        st.subheader('Bar Chart - Sector Distribution')
+        st.altair_chart(trace.payload('sector chart', chart), use_container_width=True)
+
+    elif chart_type == "Pie Chart":
+        st.subheader('Pie Chart - Sector Distribution')
+        st.image(trace.payload('sector chart', chart))
+
+    elif chart_type == "Donut Chart":
+        st.image(trace.payload('sector chart', chart))
 
 
+# Local price store in front of yf.download (shared by every session of this
+# server, and through its SQLite file by every replica on the host)
+@st.cache_resource
+def get_price_store():
+    return PriceStore()
+
+price_store = get_price_store()
+
+# Stock data retrieval and visualization
+st.sidebar.subheader('Stock Visualization Options (Closing price)')
+price_start_date = st.sidebar.date_input('Start Date', pd.to_datetime('2023-01-01'))
+price_end_date = st.sidebar.date_input('End Date', pd.to_datetime('2023-12-31'))
+price_symbol = st.sidebar.selectbox('Select a Company', list(df_selected_sector['Symbol']))
 
 # Sidebar for user options
 st.sidebar.subheader('User Options for Informed Decision-Making')
 start_date = st.sidebar.date_input('Start Date', pd.to_datetime('2023-01-01'), key='start_date')
 end_date = st.sidebar.date_input('End Date', pd.to_datetime('2023-12-31'), key='end_date')
 selected_symbol = st.sidebar.selectbox('Select a Company', list(df_selected_sector['Symbol']), key='company_select')
+bulk_load = st.sidebar.checkbox('Load prices for all companies in selected sectors')
+# Long date ranges are downsampled on the server so charts never get more points than this
+max_chart_points = st.sidebar.number_input('Max points per chart', min_value=100, max_value=20000,
+                                           value=line_budget(), step=100)
+streaming = st.sidebar.checkbox('Streaming mode (live prices)')
+if streaming:
+    stream_source = st.sidebar.selectbox('Live price source', ['Yahoo Finance (1 minute bars)', 'Replay of the selected period'])
+
+# Download stock data for both views in one go: overlapping ranges of the same
+# symbol are merged, whatever is not stored yet comes in one batched fetch and
+# is sliced back out per view
+def fetch_prices():
+    price_requests = PriceRequests(price_store, yf_batch_downloader)
+    price_requests.add('closing_price', price_symbol, price_start_date, price_end_date)
+    price_requests.add('analysis', selected_symbol, start_date, end_date)
+    price_requests.fetch()
+    st.session_state['fetches_saved'] = st.session_state.get('fetches_saved', 0) + price_requests.saved
+    trace.cache('price store', hit=True, count=price_requests.hits)
+    trace.cache('price store', hit=False, count=price_requests.misses)
+    return price_requests
+
+price_requests = sections.run('price panel', fetch_prices, stage='fetch',
+                              inputs=(price_symbol, price_start_date, price_end_date, selected_symbol, start_date, end_date))
+st.sidebar.caption(f"Price fetches saved by merging requests: {st.session_state.get('fetches_saved', 0)}")
+
+closing_chart = sections.run('closing price chart', lambda: downsample(price_requests['closing_price']['Close'], max_chart_points),
+                             inputs=(max_chart_points,), after=('price panel',))
+st.header('Stock Closing Price for ' + price_symbol)
+st.write(f'Data for {price_symbol} from {price_start_date} to {price_end_date}')
+with sections.timed('closing price chart render'):
+    st.line_chart(trace.payload('closing price chart', closing_chart))
+
+# Bulk load of every company in the selected sectors as one wide frame
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_sector_prices(symbols, start, end):
+    trace.miss('sector prices')
+    # Replicas loading the same sectors at once share the batch downloads
+    return load_bulk(get_price_store(), symbols, start, end,
+                     batch_downloader=get_shared_cache().memoize('price batches', yf_batch_downloader,
+                                                                 ttl=download_ttl, complete=download_complete))
+
+if bulk_load:
+    st.header('Prices for Companies in Selected Sectors')
+    with st.spinner('Loading prices for the selected sectors...'):
+        with trace.lookup('sector prices'), trace.span('sector prices', 'fetch'):
+            sector_prices, failed_symbols = load_sector_prices(tuple(df_selected_sector['Symbol']), start_date, end_date)
+    st.write(f"Data Dimension: {len(sector_prices.dates)} days and {len(sector_prices.symbols)} companies.")
+    if failed_symbols:
+        st.warning('Could not download: ' + ', '.join(failed_symbols))
+    sector_prices_table = sections.run('sector prices store', lambda: TableStore(sector_prices.wide('Close')),
+                                       inputs=(tuple(df_selected_sector['Symbol']), start_date, end_date))
+    paged_table('sector prices table', sector_prices_table)
+    export_download('Prices for Selected Sectors', 'SP500_prices', lambda: price_chunks(sector_prices))
 
-# Download stock data
-company_data = yf.download(selected_symbol, start=start_date, end=end_date)
+#######################
+
+company_data = price_requests['analysis']
+
+# Streaming mode: a background producer appends bars of the selected company to
+# a ring buffer; the live charts, drawn at the end of this script, only receive
+# the bars they have not shown yet
+stream_key, streamer = st.session_state.get('price_stream', (None, None))
+if streaming:
+    replay = stream_source == 'Replay of the selected period'
+    if stream_key != (selected_symbol, stream_source, start_date, end_date) or (streamer.done and not replay):
+        if streamer is not None:
+            streamer.stop()
+        # A replay plays four days of the loaded daily bars per second
+        source = ReplaySource(company_data, speed=4 * 24 * 3600) if replay else YahooSource()
+        streamer = Streamer(source, selected_symbol).start()
+        st.session_state['price_stream'] = ((selected_symbol, stream_source, start_date, end_date), streamer)
+    st.header('Live Prices for ' + selected_symbol)
+    live_status, live_close, live_candles, live_volume = st.empty(), st.empty(), st.empty(), st.empty()
+elif streamer is not None:
+    streamer.stop()
+    del st.session_state['price_stream']
+
+# Vega-Lite candlestick whose (unnamed) data can be extended with add_rows
+live_candlestick = {
+    'encoding': {
+        'x': {'field': 'Date', 'type': 'temporal'},
+        'color': {'condition': {'test': 'datum.Open <= datum.Close', 'value': '#06982d'}, 'value': '#ae1325'},
+    },
+    'layer': [
+        {'mark': 'rule', 'encoding': {'y': {'field': 'Low', 'type': 'quantitative', 'scale': {'zero': False}, 'title': 'Price'},
+                                      'y2': {'field': 'High'}}},
+        {'mark': 'bar', 'encoding': {'y': {'field': 'Open', 'type': 'quantitative'}, 'y2': {'field': 'Close'}}},
+    ],
+}
+
+def stream_live(streamer):
+    # Runs until the stream ends or a widget change interrupts the script
+    seen, shown = 0, None
+    while True:
+        bars, total = streamer.poll(seen)
+        if shown is None or shown + len(bars) > 2 * streamer.buffer.capacity:
+            # (Re)draw from the buffer, so the charts never hold more than twice its bars
+            bars, total = streamer.poll(0)
+            close_chart = live_close.line_chart(bars[['Close']])
+            candle_chart = live_candles.vega_lite_chart(bars.reset_index(), live_candlestick, use_container_width=True)
+            volume_chart = live_volume.bar_chart(bars[['Volume']])
+            shown = len(bars)
+        elif len(bars):
+            close_chart.add_rows(bars[['Close']])
+            candle_chart.add_rows(bars.reset_index())
+            volume_chart.add_rows(bars[['Volume']])
+            shown += len(bars)
+        seen = total
+        if streamer.error is not None:
+            live_status.error(f'Price stream stopped: {streamer.error}')
+            return
+        # Updating the status on every poll also lets Streamlit interrupt this loop promptly
+        last = f', last at {bars.index[-1]}' if len(bars) else ''
+        live_status.caption(f'{total} bars received{last}' + (' (stream ended)' if streamer.done else ''))
+        if streamer.done and seen == streamer.buffer.total:
+            return
+        time.sleep(REFRESH_SECONDS)
 
 st.header('Stock Data Visualization')
 
+# Golden/death cross backtest of a grid of window pairs on every company in the
+# selected sectors, cached per companies, date range and grid
+@st.cache_data(max_entries=20, show_spinner=False)
+def run_backtest(symbols, start, end, short_windows, long_windows):
+    trace.miss('backtest')
+    sector_prices, _ = load_sector_prices(symbols, start, end)
+    return crossover_grid(sector_prices.wide('Close'), short_windows, long_windows, workers=os.cpu_count())
+
+@st.cache_data(max_entries=20)
+def rolling_average_table(close):
+    trace.miss('rolling averages')
+    return rolling_means(close, range(1, 101))
+
 # Prompt the user to select the type of plot
 plot_option = st.sidebar.selectbox('Select a Plot Type', [
     'Time Series Price Plot',
     'Candlestick Chart',
     'Correlation Heatmap',
+    'Sector Correlation Heatmap',
+    'Crossover Backtest',
     'Rolling Average',
     'Trading Volume Analysis',
     'Trading Volume Analysis (with closing price)'
@@ -168,17 +386,31 @@ plot_option = st.sidebar.selectbox('Select a Plot Type', [
 if plot_option == 'Time Series Price Plot':
     st.header('Time Series Price Plot')
     st.write(f'Data for {selected_symbol} from {start_date} to {end_date}')
-    st.line_chart(company_data['Close'])
+    time_series = sections.run('analysis panel', lambda: downsample(company_data['Close'], max_chart_points),
+                               inputs=(plot_option, max_chart_points), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.line_chart(trace.payload('analysis chart', time_series))
 
 elif plot_option == 'Candlestick Chart':
     st.header('Candlestick Chart')
     # Display the explanation using st.markdown
-    fig = go.Figure(data=[go.Candlestick(x=company_data.index,
-                    open=company_data['Open'],
-                    high=company_data['High'],
-                    low=company_data['Low'],
-                    close=company_data['Close'])])
-    st.plotly_chart(fig)
+    # Long ranges are drawn as weekly, monthly or quarterly candles
+    def candlestick_chart():
+        candle_rule = ohlc_rule(company_data.index, candle_budget(max_chart_points / POINTS_PER_PIXEL))
+        candles = resample_ohlc(company_data, candle_rule)
+        fig = go.Figure(data=[go.Candlestick(x=candles.index,
+                        open=candles['Open'],
+                        high=candles['High'],
+                        low=candles['Low'],
+                        close=candles['Close'])])
+        return fig, candle_rule
+
+    fig, candle_rule = sections.run('analysis panel', candlestick_chart,
+                                    inputs=(plot_option, max_chart_points), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.plotly_chart(trace.payload('analysis chart', fig))
+    if candle_rule is not None:
+        st.caption({'W': 'Weekly', 'M': 'Monthly', 'Q': 'Quarterly'}[candle_rule] + ' candles, to keep the chart readable over this date range.')
     st.markdown(f'##### Candle chart for {selected_symbol}')
 
     candlestick_chart_guide = """
@@ -222,7 +454,11 @@ elif plot_option == 'Trading Volume Analysis':
     st.header('Trading Volume Analysis')
 
     st.write(f'Data for {selected_symbol} from {start_date} to {end_date}')
-    st.line_chart(company_data['Volume'])
+    # Min/max buckets keep every volume spike visible; missing volumes are drawn as gaps (NaN)
+    volume = sections.run('analysis panel', lambda: downsample(company_data['Volume'].astype(float), max_chart_points, method='minmax'),
+                          inputs=(plot_option, max_chart_points), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.line_chart(trace.payload('analysis chart', volume))
 
     st.markdown("""
     ### Making Informed Investment Decisions with Trading Volume Analysis
@@ -275,25 +511,11 @@ elif plot_option == 'Trading Volume Analysis (with closing price)':
     filtered_data = filtered_data.reset_index()
 
     # Create a Seaborn scatterplot with the closing price as a hue
-    fig, ax = plt.subplots()
-    ax = sns.scatterplot(data=filtered_data, x='Date', y='Volume', hue='Close', palette='coolwarm')
-
-    # Customize the plot
-    plt.xlabel('Date')
-    plt.ylabel('Trading Volume')
-    plt.title('Scatterplot of Trading Volume Over Time')
-
-    # Rotate x-axis labels for better readability
-    plt.xticks(rotation=45)
-
-    # Set a custom x-axis range to display only the selected date range
-    plt.xlim(start_date, end_date)
-
-    # # Display the plot by passing the figure to st.pyplot()
-    # fig, ax = plt.subplots()
-    # ax = sns.scatterplot(data=filtered_data, x='Date', y='Volume', hue='Close', palette='coolwarm')
-    # plt.xticks(rotation=45)
-    st.pyplot(fig)
+    scatter_png = sections.run('analysis panel', lambda: cached_figure(
+        f'volume_scatter:{start_date}:{end_date}', filtered_data[['Date', 'Volume', 'Close']],
+        lambda data: volume_scatter(data, start_date, end_date)), inputs=(plot_option,), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.image(trace.payload('analysis chart', scatter_png))
     st.markdown("""
     ### Analyzing Trading Volume and Closing Price Together
 
@@ -335,10 +557,10 @@ elif plot_option == 'Trading Volume Analysis (with closing price)':
 
 elif plot_option == 'Correlation Heatmap':
     st.header('Correlation Heatmap')
-    correlation_matrix = company_data.corr()
-    fig, ax = plt.subplots()
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', linewidths=0.5,ax=ax)
-    st.pyplot(fig)
+    heatmap_png = sections.run('analysis panel', lambda: cached_figure(
+        'correlation_heatmap', company_data.corr(), correlation_heatmap), inputs=(plot_option,), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.image(trace.payload('analysis chart', heatmap_png))
     insights = """
     #### Guide to Make Informed Investment Decisions with Correlation Heatmap
 
@@ -366,11 +588,98 @@ elif plot_option == 'Correlation Heatmap':
     st.markdown(insights)
 
 
+elif plot_option == 'Sector Correlation Heatmap':
+    st.header('Sector Correlation Heatmap')
+    symbols = tuple(df_selected_sector['Symbol'])
+
+    def sector_heatmap():
+        with st.spinner('Loading prices for the selected sectors...'):
+            with trace.lookup('sector prices'), trace.span('sector prices', 'fetch'):
+                sector_prices, _ = load_sector_prices(symbols, start_date, end_date)
+        # Keep the running sums between reruns; a later end date only adds the new days
+        with trace.span('sector correlation', 'compute'):
+            engine_key, engine = st.session_state.get('correlation_engine', (None, None))
+            if engine_key != (symbols, start_date) or (engine.last_date is not None and engine.last_date >= pd.Timestamp(end_date)):
+                engine = CorrelationEngine(symbols)
+            engine.extend(sector_prices.wide('Close'))
+            st.session_state['correlation_engine'] = ((symbols, start_date), engine)
+            return heatmap_figure(engine.matrix())
+
+    heatmap = sections.run('analysis panel', sector_heatmap, inputs=(plot_option, symbols, start_date, end_date))
+    st.write(f'Daily return correlations of {len(symbols)} companies from {start_date} to {end_date}')
+    with sections.timed('analysis panel render'):
+        st.plotly_chart(trace.payload('analysis chart', heatmap), use_container_width=True)
+    st.markdown("""
+    Companies are ordered so that those whose returns move together sit next to each other, which makes
+    blocks of closely related stocks (often the same sub-industry) show up as red squares along the diagonal.
+    With many companies selected, neighbouring companies are averaged into one cell.
+    """)
+
+
+elif plot_option == 'Crossover Backtest':
+    st.header('Crossover Backtest')
+    short_range = st.sidebar.slider('Short window range', min_value=2, max_value=100, value=(5, 50))
+    long_range = st.sidebar.slider('Long window range', min_value=10, max_value=250, value=(50, 200))
+    window_step = st.sidebar.number_input('Window step', min_value=1, max_value=50, value=5)
+    short_windows = tuple(range(short_range[0], short_range[1] + 1, window_step))
+    long_windows = tuple(range(long_range[0], long_range[1] + 1, window_step))
+    symbols = tuple(df_selected_sector['Symbol'])
+
+    def backtest_panel():
+        with st.spinner('Backtesting the window grid on the selected sectors...'):
+            with trace.lookup('backtest'), trace.span('backtest', 'compute'):
+                backtest = run_backtest(symbols, start_date, end_date, short_windows, long_windows)
+        if backtest.empty:
+            return backtest, None, None
+        summary = grid_summary(backtest)
+        returns = summary['total_return'].unstack('long') * 100
+        fig = go.Figure(go.Heatmap(z=returns.values, x=returns.columns, y=returns.index, colorscale='RdYlGn',
+                                   zmid=0, colorbar=dict(title='%')))
+        fig.update_layout(xaxis_title='Long window (days)', yaxis_title='Short window (days)')
+        return backtest, summary, fig
+
+    backtest, summary, fig = sections.run('analysis panel', backtest_panel,
+                                          inputs=(plot_option, symbols, start_date, end_date, short_windows, long_windows))
+    if backtest.empty:
+        st.warning('Every short window has to be shorter than some long window.')
+    else:
+        st.write(f'Median total return (%) over {len(symbols)} companies from {start_date} to {end_date}, '
+                 'holding while the short moving average is above the long one')
+        with sections.timed('analysis panel render'):
+            st.plotly_chart(trace.payload('analysis chart', fig), use_container_width=True)
+        pairs = {f'{short} / {long} days': (short, long)
+                 for short, long in summary['total_return'].sort_values(ascending=False).index}
+        pair = pairs[st.selectbox('Window pair (best first)', list(pairs))]
+        median = summary.loc[pair]
+        st.write(f"Median over the companies: return {median['total_return']:.1%} "
+                 f"(buy and hold {median['buy_and_hold']:.1%}), max drawdown {median['max_drawdown']:.1%}, "
+                 f"{median['trades']:.0f} trades, invested {median['exposure']:.0%} of the days.")
+        pair_table = sections.run('backtest table store', lambda: TableStore(backtest.loc[pair]),
+                                  inputs=(symbols, start_date, end_date, short_windows, long_windows, pair))
+        paged_table('backtest table', pair_table)
+    st.markdown("""
+    Each company is bought at the close after its short moving average crosses above the long one (golden cross)
+    and sold at the close after it crosses back below (death cross). Returns ignore trading costs and dividends, and
+    the best pair in the past is not necessarily the best one in the future.
+    """)
+
+
 elif plot_option == 'Rolling Average':
     st.header('Rolling Average')
     rolling_period = st.sidebar.slider('Select Rolling Period', min_value=1, max_value=100, value=20)
-    company_data['Rolling Average'] = company_data['Close'].rolling(rolling_period).mean()
-    st.line_chart(company_data[['Close', 'Rolling Average']])
+    # Every period the slider offers is computed once, so moving it is a lookup
+    def rolling_average_chart():
+        with trace.lookup('rolling averages'):
+            rolling_averages = rolling_average_table(company_data['Close'])
+        rolling_chart = pd.DataFrame({'Close': company_data['Close'], 'Rolling Average': rolling_averages[rolling_period]})
+        return downsample(rolling_chart, max_chart_points), crossovers(rolling_chart['Close'], rolling_chart['Rolling Average'])
+
+    rolling_chart, crosses = sections.run('analysis panel', rolling_average_chart,
+                                          inputs=(plot_option, max_chart_points, rolling_period), after=('price panel',))
+    with sections.timed('analysis panel render'):
+        st.line_chart(trace.payload('analysis chart', rolling_chart))
+    st.write(f'The closing price crossed above the rolling average {(crosses == 1).sum()} times '
+             f'and below it {(crosses == -1).sum()} times in this period.')
 
     rolling_average_insights = """
     #### Making Informed Decisions with Rolling Average Analysis
@@ -405,7 +714,9 @@ st.markdown("""
 
 # Show a table with detailed stock data
 st.subheader('Stock Data')
-st.write(company_data)
+stock_data_table = sections.run('stock data store', lambda: TableStore(company_data), after=('price panel',))
+with sections.timed('stock data table render'):
+    paged_table('stock data table', stock_data_table)
 
 # sp500['Daily_Return'] = sp500['Close'].pct_change()
 # plt.figure(figsize=(10, 6))
@@ -430,3 +741,17 @@ st.markdown("""
 * **Python libraries:** base64, pandas, streamlit, numpy, altair, yfinance
 * **Data source:** [Wikipedia](https://en.wikipedia.org/wiki/List_of_S%26P_500_companies).
 """)
+
+# Debug panel: where the time of this rerun went, which caches were hit and how
+# much was sent to the page. Totals over all sessions go to a Prometheus text file.
+trace.finish(rerun_started)
+if st.sidebar.checkbox('Show debug panel', key='debug_panel') and trace.enabled:
+    spans, caches, payloads = trace.report()
+    with st.sidebar.expander('Debug panel (last rerun)', expanded=True):
+        st.dataframe(spans, hide_index=True)
+        st.dataframe(caches, hide_index=True)
+        st.dataframe(payloads, hide_index=True)
+        st.caption(f'Totals of all sessions: {METRICS_PATH}')
+
+if streaming:
+    stream_live(streamer)
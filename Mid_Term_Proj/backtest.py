@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from indicators import window_means
+
+# Backtest of the moving-average crossover rule from the app's guides: hold a
+# stock while its short moving average is above the long one (buy on the
+# golden cross, sell on the death cross), trading at the next day's close.
+# A whole grid of (short, long) window pairs is evaluated on every symbol at
+# once as (pairs, days, symbols) arrays. Pairs are processed in blocks to bound
+# memory, and large grids can spread the blocks over a process pool.
+
+STATS = ['total_return', 'buy_and_hold', 'max_drawdown', 'trades', 'exposure']
+BLOCK_CELLS = 5_000_000             # (pairs x days x symbols) values per block
+PROCESS_POOL_CELLS = 200_000_000    # grids at least this large use the process pool
+
+
+def window_pairs(short_windows, long_windows):
+    return [(short, long) for short in short_windows for long in long_windows if short < long]
+
+
+def pair_stats(prices, pairs):
+    # STATS for each pair of windows on each column of prices: {name: (pairs, symbols) array}.
+    windows = sorted({window for pair in pairs for window in pair})
+    row = {window: i for i, window in enumerate(windows)}
+    means = window_means(prices, windows)
+    short = means[[row[short] for short, _ in pairs]]
+    long = means[[row[long] for _, long in pairs]]
+    signal = short > long                       # False until both averages exist
+    # held[t]: invested over the return from close t - 1 to close t. A signal
+    # seen at close t is traded at close t + 1, so it first earns on day t + 2
+    held = np.zeros_like(signal)
+    held[:, 2:] = signal[:, :-2]
+
+    returns = np.zeros_like(prices)
+    returns[1:] = prices[1:] / prices[:-1] - 1
+    returns = np.nan_to_num(returns)
+    # Equity curves in float32 and in place: the grid is memory-bound
+    equity = np.where(held, returns.astype(np.float32), np.float32(0))
+    equity += 1
+    np.cumprod(equity, axis=1, out=equity)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.divide(equity, peak, out=peak)
+    buys = held[:, 0] + (np.diff(held.astype(np.int8), axis=1) == 1).sum(axis=1)
+    return {
+        'total_return': equity[:, -1].astype(float) - 1,
+        'buy_and_hold': np.broadcast_to(np.prod(1 + returns, axis=0) - 1, buys.shape),
+        'max_drawdown': 1 - peak.min(axis=1).astype(float),
+        'trades': buys,
+        'exposure': held.mean(axis=1),
+    }
+
+
+def crossover_grid(close, short_windows, long_windows, workers=None, block_cells=BLOCK_CELLS):
+    # One row per (short, long, symbol) with short < long, for a (dates, symbols) close frame.
+    pairs = window_pairs(short_windows, long_windows)
+    symbols = list(close.columns)
+    prices = close.ffill().to_numpy(dtype=float)
+    block = max(1, block_cells // max(prices.size, 1))
+    blocks = [pairs[i:i + block] for i in range(0, len(pairs), block)]
+    if workers and len(blocks) > 1 and len(pairs) * prices.size >= PROCESS_POOL_CELLS:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(pair_stats, repeat(prices), blocks))
+    else:
+        results = [pair_stats(prices, pairs) for pairs in blocks]
+    index = pd.MultiIndex.from_arrays([
+        np.repeat([short for short, _ in pairs], len(symbols)),
+        np.repeat([long for _, long in pairs], len(symbols)),
+        np.tile(symbols, len(pairs)),
+    ], names=['short', 'long', 'symbol'])
+    return pd.DataFrame({name: np.concatenate([result[name] for result in results]).ravel() if results else []
+                         for name in STATS}, index=index)
+
+
+def grid_summary(results):
+    # Median of every statistic over the symbols, per (short, long) pair.
+    return results.groupby(level=['short', 'long']).median()
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import crossover_grid
+from fakes import FakePriceSource
+
+# Crossover backtest of a window grid on every symbol: the vectorized grid
+# against a pandas loop over symbols and window pairs (timed on a sample of
+# symbols and scaled up).
+# Usage: python benchmarks/bench_backtest.py [symbols] [years] [workers]
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+source = FakePriceSource()
+close = pd.DataFrame({f'S{i:03d}': source.bars(f'S{i:03d}', f'{2024 - years}-01-01', '2024-01-01')['Close']
+                      for i in range(count)})
+short_windows, long_windows = range(5, 55, 5), range(20, 220, 20)
+
+
+def pandas_backtest(prices, short, long):
+    prices = prices.ffill()
+    held = (prices.rolling(short).mean() > prices.rolling(long).mean()).shift(2, fill_value=False)
+    equity = (1 + prices.pct_change().fillna(0).where(held, 0)).cumprod()
+    return equity.iloc[-1] - 1, (1 - equity / equity.cummax()).max(), int((held.astype(int).diff() == 1).sum())
+
+
+t0 = time.perf_counter()
+results = crossover_grid(close, short_windows, long_windows, workers=workers)
+grid_seconds = time.perf_counter() - t0
+pairs = len(results) // count
+
+sample = close.columns[:20]
+t0 = time.perf_counter()
+for short in short_windows:
+    for long in long_windows:
+        if short < long:
+            for symbol in sample:
+                pandas_backtest(close[symbol], short, long)
+loop_seconds = (time.perf_counter() - t0) * count / len(sample)
+
+print(f'{count} symbols x {len(close)} days x {pairs} window pairs')
+print(f'vectorized grid: {grid_seconds:.2f} s   pandas loop (estimated): {loop_seconds:.1f} s')
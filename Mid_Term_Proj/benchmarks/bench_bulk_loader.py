@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import load_bulk
+from fakes import FakePriceSource, fake_constituents
+from price_store import PriceStore
+
+# Bulk sector load against a local fake price source.
+# Usage: python benchmarks/bench_bulk_loader.py [symbols] [latency seconds]
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+symbols = list(fake_constituents(n)['Symbol'])
+start, end = '2004-01-01', '2024-01-01'
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    source = FakePriceSource(latency)
+    store = PriceStore(cache_dir, source.download)
+
+    t0 = time.perf_counter()
+    for symbol in symbols[:20]:
+        store.get(symbol, start, end)
+    one_by_one = (time.perf_counter() - t0) / 20 * n
+    for symbol in symbols[:20]:
+        store.drop(symbol)
+
+    source.calls = 0
+    t0 = time.perf_counter()
+    panel, failed = load_bulk(store, symbols, start, end, source.download_batch, backoff=0)
+    cold = time.perf_counter() - t0
+    calls = source.calls
+
+    t0 = time.perf_counter()
+    load_bulk(store, symbols, start, end, source.download_batch, backoff=0)
+    warm = time.perf_counter() - t0
+
+print(f'{n} symbols x {len(panel.dates)} days, latency {latency * 1000:.0f} ms per request')
+print(f'one by one (extrapolated): {one_by_one:8.2f} s')
+print(f'bulk, cold store:          {cold:8.2f} s  ({calls} requests, {len(failed)} failed)')
+print(f'bulk, warm store:          {warm:8.2f} s')
@@ -0,0 +1,53 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact import PricePanel, compact_constituents, compact_prices
+from fakes import FakePriceSource, fake_constituents
+
+# Memory of the price and constituent data as the app used to hold it (float64,
+# object strings, one DatetimeIndex per symbol, NaN-padded wide frames) against
+# the compact layer. Pickled size is what st.cache_data keeps per cached entry.
+# A quarter of the symbols are listed partway through the period, as in the
+# real index. Usage: python benchmarks/bench_compact.py [symbols] [years]
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+years = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+start, end = pd.Timestamp(f'{2024 - years}-01-01'), pd.Timestamp('2024-01-01')
+rng = np.random.default_rng(0)
+source = FakePriceSource()
+symbols = [f'S{i:03d}' for i in range(count)]
+frames = {}
+for symbol in symbols:
+    listed = start + pd.Timedelta(days=int(rng.integers(0, (end - start).days))) if rng.random() < 0.25 else start
+    frames[symbol] = source.bars(symbol, listed, end).rename_axis('Date')
+
+long = pd.concat([frame.assign(Symbol=symbol) for symbol, frame in frames.items()]).reset_index()
+wide = long.pivot(index='Date', columns='Symbol', values=list(frames[symbols[0]].columns))
+constituents = fake_constituents(count)
+
+
+def sizes(value):
+    if isinstance(value, dict):
+        memory = sum(frame.memory_usage(deep=True).sum() for frame in value.values())
+    elif isinstance(value, PricePanel):
+        memory = value.nbytes
+    else:
+        memory = value.memory_usage(deep=True).sum()
+    return memory / 2 ** 20, len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) / 2 ** 20
+
+
+rows = [
+    ('per-symbol frames', frames, {symbol: compact_prices(frame) for symbol, frame in frames.items()}),
+    ('multi-symbol data', wide, PricePanel.from_long(long, symbols)),
+    ('constituents', constituents, compact_constituents(constituents)),
+]
+print(f'{count} symbols x {years} years, {len(long):,} bars')
+print(f"{'':<20}{'before MB':>11}{'pickled':>9}{'after MB':>11}{'pickled':>9}")
+for name, before, after in rows:
+    print(f'{name:<20}' + '{:>11.2f}{:>9.2f}'.format(*sizes(before)) + '{:>11.2f}{:>9.2f}'.format(*sizes(after)))
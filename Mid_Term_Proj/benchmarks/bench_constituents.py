@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constituents import load_snapshot, write_snapshot
+from fakes import fake_constituents
+
+# Cold-start cost of the constituents table: parsing the Wikipedia HTML table
+# (from a local file, so network time is not even counted) versus reading the
+# memory-mapped Feather snapshot.
+# Usage: python benchmarks/bench_constituents.py [repeats]
+
+repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+df = fake_constituents()
+
+with tempfile.TemporaryDirectory() as tmp:
+    html_path = os.path.join(tmp, 'sp500.html')
+    snapshot_path = os.path.join(tmp, 'sp500.feather')
+    df.to_html(html_path, index=False)
+    write_snapshot(df, snapshot_path)
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        pd.read_html(html_path, header=0)[0]
+    html_ms = (time.perf_counter() - t0) / repeats * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        load_snapshot(snapshot_path)
+    snapshot_ms = (time.perf_counter() - t0) / repeats * 1000
+
+    print(f'{len(df)} constituents, snapshot {os.path.getsize(snapshot_path):,} bytes')
+    print(f'read_html (local file): {html_ms:7.2f} ms')
+    print(f'Feather snapshot:       {snapshot_ms:7.2f} ms')
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+import plotly.graph_objects as go
+from streamlit.type_util import data_frame_to_bytes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import candle_budget, downsample, line_budget, ohlc_rule, resample_ohlc
+from fakes import FakePriceSource
+
+# Payload size and serialization time of the price charts before and after
+# server-side downsampling. Serialization (Arrow for st.line_chart, JSON for
+# Plotly) is what Streamlit does before the browser can start rendering.
+# Usage: python benchmarks/bench_downsample.py [years]
+
+years = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+data = FakePriceSource().bars('AAPL', f'{2024 - years}-01-01', '2024-01-01')
+
+
+def measure(build, repeat=5):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        payload = build()
+    return len(payload), (time.perf_counter() - t0) / repeat * 1000
+
+
+def line_payload(series):
+    return data_frame_to_bytes(series.to_frame())
+
+
+def candle_payload(bars):
+    return go.Figure(data=[go.Candlestick(x=bars.index, open=bars['Open'], high=bars['High'],
+                                          low=bars['Low'], close=bars['Close'])]).to_json()
+
+
+rows = [
+    ('Close line', lambda: line_payload(data['Close']),
+     lambda: line_payload(downsample(data['Close'], line_budget()))),
+    ('Volume line', lambda: line_payload(data['Volume']),
+     lambda: line_payload(downsample(data['Volume'], line_budget(), method='minmax'))),
+    ('Candlestick', lambda: candle_payload(data),
+     lambda: candle_payload(resample_ohlc(data, ohlc_rule(data.index, candle_budget())))),
+]
+
+print(f'{len(data)} daily bars over {years} years')
+print(f"{'chart':<14}{'before':>22}{'after':>22}")
+for name, before, after in rows:
+    size_before, ms_before = measure(before)
+    size_after, ms_after = measure(after)
+    print(f'{name:<14}{size_before:>11,} B {ms_before:>6.1f} ms{size_after:>11,} B {ms_after:>6.1f} ms')
@@ -0,0 +1,55 @@
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import FORMATS, export_file, frame_chunks
+
+# Peak Python memory of the old base64 data-URI download versus the chunked
+# export, as the number of exported rows grows. The exported frame itself is
+# built before measuring, so only the memory used by the export is counted.
+# tracemalloc only sees Python allocations, so Arrow's buffers for Parquet are not included.
+# Usage: python benchmarks/bench_export.py
+
+
+def data_uri(df):
+    # The old filedownload(): whole CSV string, its bytes, and their base64 text.
+    csv = df.to_csv(index=False)
+    b64 = base64.b64encode(csv.encode()).decode()
+    return f'<a href="data:file/csv;base64,{b64}" download="SP500.csv">Download CSV File</a>'
+
+
+def measure(func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20, elapsed
+
+
+rng = np.random.default_rng(0)
+with tempfile.TemporaryDirectory() as tmp:
+    print(f"{'rows':>10}  {'data URI':>18}" + ''.join(f'{fmt:>20}' for fmt in FORMATS))
+    for rows in [10_000, 100_000, 1_000_000]:
+        df = pd.DataFrame({
+            'Date': pd.date_range('1990-01-01', periods=rows, freq='h'),
+            'Symbol': rng.choice(['AAPL', 'MSFT', 'XOM', 'JPM'], rows),
+            'Close': rng.random(rows) * 100,
+            'Volume': rng.integers(0, 10 ** 7, rows),
+        })
+        line = f'{rows:>10,}'
+        peak, elapsed = measure(lambda: data_uri(df))
+        line += f'  {peak:7.1f} MB {elapsed:6.2f} s'
+        for fmt in FORMATS:
+            peak, elapsed = measure(lambda: export_file(frame_chunks(df), 'bench', fmt, tmp))
+            line += f'  {peak:7.1f} MB {elapsed:6.2f} s'
+        print(line)
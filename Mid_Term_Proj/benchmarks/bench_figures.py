@@ -0,0 +1,72 @@
+import io
+import os
+import resource
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import fake_constituents
+from figures import FigureCache, sector_pie
+
+# Time and memory per rerun of the sector chart over a long session, drawing
+# with the global pyplot state as the app used to (figures never closed) and
+# through the FigureCache. Each rerun picks a chart type and one of a handful
+# of sector selections, like a user clicking around.
+# Usage: python benchmarks/bench_figures.py [reruns]
+
+reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+constituents = fake_constituents()
+sectors = sorted(constituents['GICS Sector'].unique())
+selections = [sectors, sectors[:5], sectors[3:9], sectors[::2]]
+
+
+def sector_counts(selection):
+    counts = constituents[constituents['GICS Sector'].isin(selection)]['GICS Sector'].value_counts().reset_index()
+    counts.columns = ['Sector', 'Count']
+    return counts
+
+
+def pyplot_rerun(chart_type, counts):
+    plt.figure(figsize=(8, 8))
+    sns.set_palette('viridis')
+    plt.pie(counts['Count'], labels=counts['Sector'], autopct='%1.1f%%', startangle=140,
+            pctdistance=0.85 if chart_type == 'donut' else 0.6)
+    if chart_type == 'donut':
+        plt.gca().add_artist(plt.Circle((0, 0), 0.70, fc='white'))
+    plt.axis('equal')
+    plt.title('S&P 500 Sector Distribution')
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png')  # what st.pyplot(plt) does
+    return buffer.getvalue()
+
+
+cache = FigureCache()
+
+
+def cached_rerun(chart_type, counts):
+    return cache.get(chart_type, counts, lambda data: sector_pie(data, donut=chart_type == 'donut'))
+
+
+def session(rerun):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    for i in range(reruns):
+        rerun(['pie', 'donut'][i % 2], sector_counts(selections[(i // 2) % len(selections)]))
+    elapsed = (time.perf_counter() - t0) / reruns * 1000
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    return elapsed, rss_growth
+
+
+# The cached session runs first so its peak RSS is not hidden by the pyplot one.
+cached_ms, cached_mb = session(cached_rerun)
+pyplot_ms, pyplot_mb = session(pyplot_rerun)
+print(f'{reruns} reruns')
+print(f'pyplot, never closed: {pyplot_ms:7.1f} ms/rerun, peak RSS +{pyplot_mb:6.1f} MB, {len(plt.get_fignums())} open figures')
+print(f'FigureCache:          {cached_ms:7.1f} ms/rerun, peak RSS +{cached_mb:6.1f} MB, '
+      f'{cache.misses} renders, {cache.hits} cache hits')
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakePriceSource
+from shared_cache import FileBackend, SharedCache, SQLiteBackend
+
+# Several replicas (processes) with several sessions (threads) each ask for the
+# same symbols and range at the same moment. Without a shared cache every
+# session downloads; with one, each symbol is downloaded once in total.
+# Usage: python benchmarks/bench_shared_cache.py [replicas] [sessions] [symbols] [latency]
+
+replicas = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+symbols = [f'S{i:03d}' for i in range(int(sys.argv[3]) if len(sys.argv) > 3 else 5)]
+latency = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+START, END = '2023-01-01', '2024-01-01'
+
+
+def replica(args):
+    # Downloads made by one replica's sessions.
+    kind, location = args
+    source = FakePriceSource(latency)
+    download = source.download
+    if kind == 'sqlite':
+        download = SharedCache(SQLiteBackend(location)).memoize('prices', source.download)
+    elif kind == 'files':
+        download = SharedCache(FileBackend(location)).memoize('prices', source.download)
+    with ThreadPoolExecutor(sessions) as pool:
+        list(pool.map(lambda symbol: download(symbol, START, END), symbols * sessions))
+    return source.calls
+
+
+print(f'{replicas} replicas x {sessions} sessions, {len(symbols)} symbols, latency {latency * 1000:.0f} ms')
+with tempfile.TemporaryDirectory() as directory:
+    for kind, location in [('none', None), ('sqlite', os.path.join(directory, 'shared.sqlite')),
+                           ('files', os.path.join(directory, 'shared'))]:
+        t0 = time.perf_counter()
+        with Pool(replicas) as pool:
+            calls = sum(pool.map(replica, [(kind, location)] * replicas))
+        print(f'{kind:<8}{calls:>6} downloads {time.perf_counter() - t0:>8.2f} s')
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+from streamlit.type_util import data_frame_to_bytes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakePriceSource
+from streaming import RingBuffer, ReplaySource, Streamer
+
+# Streaming mode fed by an accelerated replay of recorded bars. Measures how
+# fast the producer fills the ring buffer, and the bytes the page sends per
+# poll when it appends only the new bars versus redrawing everything it holds.
+# Usage: python benchmarks/bench_streaming.py [bars] [bars per poll]
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+per_poll = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+recorded = FakePriceSource().bars('AAPL', '1900-01-01', '2100-01-01').iloc[:count]
+
+streamer = Streamer(ReplaySource(recorded, speed=float('inf')), 'AAPL').start()
+t0 = time.perf_counter()
+while not streamer.done:
+    time.sleep(0.001)
+seconds = time.perf_counter() - t0
+print(f'replay: {streamer.buffer.total} bars in {seconds:.2f} s ({streamer.buffer.total / seconds:,.0f} bars/s), '
+      f'error: {streamer.error}')
+
+buffer = RingBuffer()
+seen = 0
+incremental = redraw = polls = 0
+t0 = time.perf_counter()
+for start in range(0, len(recorded), per_poll):
+    buffer.append(recorded.iloc[start:start + per_poll])
+    new, seen = buffer.since(seen)
+    incremental += len(data_frame_to_bytes(new[['Close']]))
+    redraw += len(data_frame_to_bytes(buffer.since(0)[0][['Close']]))
+    polls += 1
+print(f'{polls} polls of {per_poll} bars, ring buffer of {buffer.capacity}: '
+      f'{(time.perf_counter() - t0) / polls * 1000:.2f} ms per poll')
+print(f'bytes per poll: add_rows {incremental / polls:,.0f} B, full redraw {redraw / polls:,.0f} B')
@@ -0,0 +1,91 @@
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Local stand-ins for Yahoo Finance so the benchmarks run without network.
+
+
+class FakePriceSource:
+    # Deterministic random-walk OHLCV bars. latency is slept once per call to
+    # imitate a network round trip; calls counts every download.
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def bars(self, symbol, start, end):
+        dates = pd.date_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+        dates = dates[dates.dayofweek < 5]
+        # Seed from the symbol and the absolute day number so overlapping
+        # requests return the same bars.
+        days = (dates.values.astype('datetime64[D]').astype(np.int64))
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        base = 50 + 100 * rng.random()
+        steps = np.sin(days * 0.05 + rng.random() * 6) + 0.002 * days
+        close = base + steps * base * 0.05
+        spread = np.abs(np.cos(days * 0.3)) * 0.02 * base
+        return pd.DataFrame({
+            'Open': close - spread / 2,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Adj Close': close,
+            'Volume': (1e6 * (1.5 + np.sin(days * 0.7))).astype(np.int64),
+        }, index=dates)
+
+    def _tick(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def download(self, symbol, start, end):
+        # Same signature as price_store.yf_downloader.
+        self._tick()
+        return self.bars(symbol, start, end)
+
+    def download_batch(self, symbols, start, end):
+        # Same signature as bulk_loader.yf_batch_downloader.
+        self._tick()
+        return {symbol: self.bars(symbol, start, end) for symbol in symbols}
+
+
+def fake_constituents(n=500):
+    sectors = ['Communication Services', 'Consumer Discretionary', 'Consumer Staples', 'Energy',
+               'Financials', 'Health Care', 'Industrials', 'Information Technology',
+               'Materials', 'Real Estate', 'Utilities']
+    symbols = [f'S{i:03d}' for i in range(n)]
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Security': [f'Company {s}' for s in symbols],
+        'GICS Sector': [sectors[i % len(sectors)] for i in range(n)],
+        'GICS Sub-Industry': [f'Sub-Industry {i % 60}' for i in range(n)],
+        'Headquarters Location': 'Somewhere, USA',
+        'Date added': '2000-01-01',
+        'CIK': range(n),
+        'Founded': '1900',
+    })
+
+
+def install_fake_providers(latency=0.0, constituents=500):
+    # Point yfinance and the Wikipedia scrape at local fakes for the whole
+    # process. Returns the fake price source.
+    import yfinance
+
+    source = FakePriceSource(latency)
+    table = fake_constituents(constituents)
+
+    def download(tickers, start=None, end=None, group_by='column', **kwargs):
+        if isinstance(tickers, str):
+            return source.download(tickers, start, end)
+        frames = source.download_batch(list(tickers), start, end)
+        wide = pd.concat(frames, axis=1)
+        return wide if group_by == 'ticker' else wide.swaplevel(axis=1).sort_index(axis=1)
+
+    yfinance.download = download
+    pd.read_html = lambda url, header=0, **kwargs: [table.copy()]
+    return source
@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+REPO = os.path.dirname(APP_DIR)
+sys.path[:0] = [HERE, APP_DIR]
+
+# Headless benchmark and load test for the Streamlit apps of this repo.
+# Each app is driven through Streamlit's AppTest (streamlit >= 1.28, see
+# benchmarks/requirements.txt) against local fake yfinance and Wikipedia data
+# sources, replaying scripted widget interactions. It reports the
+# cold start, p50/p95 rerun latency, peak RSS and the bytes each rerun sends
+# (element messages plus media files such as chart images).
+#
+#   python benchmarks/harness.py                       # every app, one session
+#   python benchmarks/harness.py --app stockprice --sessions 1 4 8
+#
+# With several sessions, that many simulated users run the same scenario at
+# once on threads of one process, as they would on one server. Every
+# (app, sessions) pair runs in its own process, so each row's peak RSS and
+# cold start are its own.
+
+APPS = {
+    'stockprice': os.path.join(APP_DIR, 'StockPrice.py'),
+    'hw1': os.path.join(REPO, 'Project_HW_1', 'project_HW_1.py'),
+    'hw2': os.path.join(REPO, 'Project_HW_2', 'project_hw_2.py'),
+}
+
+
+def sidebar_widget(at, kind, label):
+    return next(w for w in getattr(at.sidebar, kind) if w.label == label)
+
+
+def stockprice_scenario(at):
+    # (name, action) pairs; each action changes widgets before the next rerun.
+    sectors = sidebar_widget(at, 'multiselect', 'Select Sectors')
+    all_sectors = list(sectors.options)
+    symbols = list(at.sidebar.selectbox(key='company_select').options)
+    plot_types = list(sidebar_widget(at, 'selectbox', 'Select a Plot Type').options)
+    steps = [('rerun', lambda at: None)]
+    steps += [('sector change', lambda at, chosen=chosen: sidebar_widget(at, 'multiselect', 'Select Sectors').set_value(chosen))
+              for chosen in [all_sectors[:3], all_sectors[3:6], all_sectors]]
+    steps += [('symbol switch', lambda at, symbol=symbol: at.sidebar.selectbox(key='company_select').select(symbol))
+              for symbol in symbols[1:4]]
+    steps += [('chart type switch', lambda at, chart=chart: sidebar_widget(at, 'selectbox', 'Select Chart Type').select(chart))
+              for chart in ['Bar Chart', 'Donut Chart', 'Pie Chart']]
+    steps += [('plot type switch', lambda at, plot=plot: sidebar_widget(at, 'selectbox', 'Select a Plot Type').select(plot))
+              for plot in plot_types if plot not in ('Sector Correlation Heatmap', 'Crossover Backtest', 'Rolling Average')]
+    steps += [('plot type switch', lambda at: sidebar_widget(at, 'selectbox', 'Select a Plot Type').select('Rolling Average'))]
+    steps += [('slider move', lambda at, period=period: sidebar_widget(at, 'slider', 'Select Rolling Period').set_value(period))
+              for period in [5, 50, 100, 20]]
+    return steps
+
+
+def explorer_scenario(at):
+    # The dataset explorers: plain reruns, every encoding switched and back,
+    # then the dataset grown through each sample size and back.
+    steps = [('rerun', lambda at: None)] * 3
+    for box in at.sidebar.selectbox:
+        if box.label != 'Rows':
+            steps += [('encoding switch', lambda at, label=box.label, index=index: sidebar_widget(at, 'selectbox', label).select_index(index))
+                      for index in [(box.index + 1) % len(box.options), box.index]]
+    rows = sidebar_widget(at, 'selectbox', 'Rows')
+    steps += [('rows switch', lambda at, index=index: sidebar_widget(at, 'selectbox', 'Rows').select_index(index))
+              for index in [*range(1, len(rows.options)), 0]]
+    return steps
+
+
+SCENARIOS = {'stockprice': stockprice_scenario, 'hw1': explorer_scenario, 'hw2': explorer_scenario}
+
+
+class MediaCounter:
+    # Counts the bytes of media files (st.image, st.pyplot, ...) handed to the
+    # browser, which element messages only reference by URL. Bytes are kept
+    # per session, identified by the session state the script runs with.
+    def __init__(self):
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        self.bytes = {}
+        self._lock = threading.Lock()
+        original = MediaFileManager.add
+
+        def add(manager, path_or_data, *args, **kwargs):
+            ctx = get_script_run_ctx()
+            if isinstance(path_or_data, bytes) and ctx is not None:
+                key = id(ctx.session_state._state)
+                with self._lock:
+                    self.bytes[key] = self.bytes.get(key, 0) + len(path_or_data)
+            return original(manager, path_or_data, *args, **kwargs)
+
+        MediaFileManager.add = add
+
+    def take(self, at):
+        with self._lock:
+            return self.bytes.pop(id(at.session_state._state), 0)
+
+
+def shared_runtime():
+    # AppTest installs and removes a mock Runtime around every run, which
+    # breaks when several sessions run at once. Keep one mock installed.
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def message_bytes(node):
+    # Serialized size of every element message in the rendered tree.
+    proto = getattr(node, 'proto', None)
+    size = proto.ByteSize() if proto is not None and hasattr(proto, 'ByteSize') else 0
+    for child in getattr(node, 'children', {}).values():
+        size += message_bytes(child)
+    return size
+
+
+def timed_run(at):
+    # Seconds for one rerun. AppTest is not built for overlapping sessions and
+    # now and then hands back an empty page when they do; such a run is
+    # repeated and its time included.
+    t0 = time.perf_counter()
+    at.run()
+    while not at.exception and not len(at.main.children):
+        at.run()
+    return time.perf_counter() - t0
+
+
+def run_session(app, media, results, timeout):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APPS[app], default_timeout=timeout)
+    start = timed_run(at)
+    if at.exception:
+        raise RuntimeError(f'{app}: {at.exception[0].message}')
+    name = threading.current_thread().name
+    samples = [('start', start, message_bytes(at._tree) + media.take(at))]
+    for step, action in SCENARIOS[app](at):
+        action(at)
+        seconds = timed_run(at)
+        samples.append((step, seconds, message_bytes(at._tree) + media.take(at)))
+        if at.exception:
+            raise RuntimeError(f'{app} after {step}: {at.exception[0].message}')
+    results[name] = samples
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(app, sessions, media, timeout):
+    results = {}
+    threads = [threading.Thread(target=run_session, args=(app, media, results, timeout), name=f'{app}-{sessions}-{i}')
+               for i in range(sessions)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - t0
+    if len(results) != sessions:
+        raise RuntimeError(f'{app}: {sessions - len(results)} of {sessions} sessions failed')
+    starts = [samples[0][1] for samples in results.values()]
+    reruns = [s for samples in results.values() for s in samples[1:]]
+    latencies = [seconds * 1000 for _, seconds, _ in reruns]
+    return {
+        'start_ms': max(starts) * 1000,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'kb_per_rerun': statistics.mean(size for _, _, size in reruns) / 1024,
+        'peak_rss_mb': peak_rss_mb(),
+        'wall_s': wall,
+        'by_step': {step: statistics.median(s * 1000 for name, s, _ in reruns if name == step)
+                    for step in dict.fromkeys(name for name, _, _ in reruns)},
+    }
+
+
+def run_child(args, app, sessions):
+    # One benchmark in a fresh interpreter, so that peak RSS (the high-water
+    # mark of the whole process) and the caches belong to this run alone.
+    command = [sys.executable, *(f'-W{option}' for option in sys.warnoptions), os.path.abspath(__file__), '--child', '--app', app, '--sessions', str(sessions),
+               '--latency', str(args.latency), '--timeout', str(args.timeout)]
+    output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_here(args):
+    cache_dir = tempfile.mkdtemp(prefix='stockprice-bench-')
+    os.environ['STOCKPRICE_CACHE_DIR'] = cache_dir
+    os.environ['SP500_SNAPSHOT'] = os.path.join(cache_dir, 'sp500_constituents.feather')
+
+    from fakes import install_fake_providers
+    install_fake_providers(args.latency)
+    media = MediaCounter()
+    sessions = args.sessions[0]
+    if sessions > 1:
+        shared_runtime()
+        # Every script run inserts its own path into sys.path and removes it
+        # afterwards; with runs overlapping that races with imports in other
+        # sessions, so keep the paths in sys.path for the whole benchmark.
+        sys.path.extend(APPS.values())
+    print(json.dumps(benchmark(args.app, sessions, media, args.timeout)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless benchmark of the Streamlit apps')
+    parser.add_argument('--app', choices=[*APPS, 'all'], default='all')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1],
+                        help='numbers of concurrent sessions to run, e.g. 1 4 8')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake price request')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--steps', action='store_true', help='also print the median latency of each step')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_here(args)
+
+    apps = list(APPS) if args.app == 'all' else [args.app]
+    print(f"{'app':<12}{'sessions':>9}{'start ms':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'KB/rerun':>10}{'peak RSS MB':>13}{'wall s':>8}")
+    for app in apps:
+        for sessions in args.sessions:
+            result = run_child(args, app, sessions)
+            print(f"{app:<12}{sessions:>9}{result['start_ms']:>10.0f}{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}"
+                  f"{result['kb_per_rerun']:>10.1f}{result['peak_rss_mb']:>13.0f}{result['wall_s']:>8.1f}")
+            if args.steps:
+                for step, ms in result['by_step'].items():
+                    print(f'    {step:<20}{ms:>8.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from price_store import failed_download
+
+# Bulk OHLCV loading for every symbol of the selected sectors.
+# Symbols whose missing date range is the same are downloaded together in
+# batches on a bounded thread pool, written into the PriceStore and read back
+# as one compact PricePanel. yfinance reports a failed symbol by leaving it out
+# of the result or empty rather than by raising, so the symbols a batch did
+# not bring back are retried on their own with exponential backoff, and
+# reported as failed if they never come.
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+
+def yf_batch_downloader(symbols, start, end):
+    # Download several tickers with one request and split them per symbol.
+    import yfinance as yf
+    data = yf.download(list(symbols), start=start, end=end, progress=False, group_by='ticker')
+    if not isinstance(data.columns, pd.MultiIndex):
+        # One ticker: older yfinance versions do not group its columns
+        return {symbols[0]: data}
+    return {symbol: data[symbol].dropna(how='all') for symbol in symbols if symbol in data.columns.levels[0]}
+
+
+def with_retry(func, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+    # Call func, retrying failures after backoff, 2 * backoff, 4 * backoff, ... seconds.
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception:
+            if attempt == retries:
+                raise
+            sleep(backoff * 2 ** attempt)
+
+
+def plan_batches(store, symbols, start, end, batch_size=DEFAULT_BATCH_SIZE):
+    # Group symbols by the date range they are missing and cut each group into batches.
+    groups = {}
+    for symbol in symbols:
+        for lo, hi in store.missing(symbol, start, end):
+            groups.setdefault((lo, hi), []).append(symbol)
+    batches = []
+    for (lo, hi), group in groups.items():
+        for i in range(0, len(group), batch_size):
+            batches.append((group[i:i + batch_size], lo, hi))
+    return batches
+
+
+def load_bulk(store, symbols, start, end, batch_downloader=yf_batch_downloader,
+              batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_WORKERS,
+              retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+    # Returns (PricePanel, list of symbols that could not be downloaded).
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    symbols = list(dict.fromkeys(symbols))
+    failed = []
+
+    def run(batch, lo, hi):
+        # Symbols of batch still missing after every retry.
+        pending = batch
+
+        def attempt():
+            nonlocal pending
+            frames = batch_downloader(pending, lo, hi)
+            missing = [symbol for symbol in pending if failed_download(frames.get(symbol), lo, hi)]
+            for symbol in pending:
+                if symbol not in missing:
+                    store.put(symbol, frames.get(symbol), lo, hi)
+            pending = missing
+            if pending:
+                raise RuntimeError('no bars for ' + ', '.join(pending))
+
+        try:
+            with_retry(attempt, retries, backoff, sleep)
+        except Exception:
+            return pending
+        return []
+
+    batches = plan_batches(store, symbols, start, end, batch_size)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for future in as_completed([pool.submit(run, batch, lo, hi) for batch, lo, hi in batches]):
+            failed.extend(future.result())
+    failed = set(failed)
+    return store.get_panel(symbols, start, end), [symbol for symbol in symbols if symbol in failed]
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Compact in-memory representation of price and constituent frames.
+# Prices are float32 (about 7 significant digits, plenty for quotes), volumes
+# nullable integers (a missing volume stays missing) and repeated strings
+# categorical. Bars of many symbols are held in a
+# PricePanel: one shared date axis, and per field one flat array in which
+# every symbol owns a slice, so no symbol repeats the dates or is padded with
+# NaN for days before it was listed.
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+CATEGORY_COLUMNS = ['GICS Sector', 'GICS Sub-Industry', 'Headquarters Location']
+
+
+def compact_volume(volume):
+    # Nullable Int32 array, Int64 if some volume does not fit. Missing volumes
+    # stay missing (NA), rather than looking like days without trades.
+    volume = pd.Series(volume, copy=False).astype('Float64').round()
+    largest = volume.max()
+    dtype = 'Int32' if largest is pd.NA or largest < 2 ** 31 else 'Int64'
+    return volume.astype(dtype).array
+
+
+def compact_prices(frame):
+    # OHLCV frame with float32 prices and integer volume.
+    frame = frame.copy()
+    for field in PRICE_FIELDS:
+        if field in frame:
+            frame[field] = frame[field].astype(np.float32)
+    if 'Volume' in frame:
+        frame['Volume'] = compact_volume(frame['Volume'])
+    return frame
+
+
+def compact_constituents(df):
+    # Constituents with the repeated text columns as categoricals. Symbols are
+    # unique here, so they stay plain strings.
+    df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+
+class PricePanel:
+    # Bars of many symbols. Symbol i owns rows offsets[i]:offsets[i + 1] of every
+    # field array; positions gives each row's index into dates.
+
+    def __init__(self, dates, symbols, offsets, positions, fields):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.offsets = offsets
+        self.positions = positions
+        self.fields = fields
+
+    @classmethod
+    def from_long(cls, data, symbols=None):
+        # From a frame with Symbol, Date and OHLCV columns, one row per bar.
+        symbols = list(dict.fromkeys(data['Symbol'])) if symbols is None else list(symbols)
+        codes = pd.Categorical(data['Symbol'], categories=symbols).codes
+        known = codes >= 0
+        data, codes = data[known], codes[known]
+        dates = pd.DatetimeIndex(pd.to_datetime(data['Date']))
+        axis = pd.DatetimeIndex(dates.unique()).sort_values().rename('Date')
+        positions = axis.get_indexer(dates).astype(np.int32)
+        order = np.lexsort((positions, codes))
+        offsets = np.searchsorted(codes[order], np.arange(len(symbols) + 1)).astype(np.int64)
+        fields = {field: data[field].to_numpy(dtype=np.float32)[order] for field in PRICE_FIELDS}
+        fields['Volume'] = compact_volume(data['Volume'].to_numpy()[order])
+        return cls(axis, symbols, offsets, positions[order], fields)
+
+    @property
+    def nbytes(self):
+        return (self.dates.nbytes + self.offsets.nbytes + self.positions.nbytes
+                + sum(values.nbytes for values in self.fields.values()))
+
+    def _columns(self):
+        # Symbol number of every row.
+        return np.repeat(np.arange(len(self.symbols), dtype=np.int32), np.diff(self.offsets))
+
+    def wide(self, field):
+        # (dates, symbols) frame of one field, NaN where a symbol has no bar
+        # (or, for Volume, where the bar's volume is missing).
+        values = self.fields[field]
+        if values.dtype != np.float32:
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        out = np.full((len(self.dates), len(self.symbols)), np.nan, dtype=values.dtype)
+        out[self.positions, self._columns()] = values
+        return pd.DataFrame(out, index=self.dates, columns=self.symbols)
+
+    def get(self, symbol):
+        # One symbol's bars, shaped like PriceStore.get.
+        i = self.symbols.index(symbol)
+        rows = slice(self.offsets[i], self.offsets[i + 1])
+        return pd.DataFrame({field: values[rows] for field, values in self.fields.items()},
+                            index=self.dates[self.positions[rows]])
+
+    def long(self, symbols=None):
+        # Date, Symbol (categorical) and OHLCV columns for the given symbols, one row per bar.
+        numbers = range(len(self.symbols)) if symbols is None else [self.symbols.index(s) for s in symbols]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in numbers] or [[]]).astype(np.int64)
+        columns = self._columns()[rows]
+        long = pd.DataFrame({
+            'Date': self.dates[self.positions[rows]],
+            'Symbol': pd.Categorical.from_codes(columns, categories=self.symbols),
+        })
+        for field, values in self.fields.items():
+            long[field] = values[rows]
+        return long
@@ -0,0 +1,121 @@
+import datetime
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from compact import compact_constituents
+
+# Offline, versioned snapshot of the S&P 500 constituents table.
+# The app reads an uncompressed Feather file through a memory map at startup,
+# so a cold start is a local file read. Scraping Wikipedia only happens to
+# build the first snapshot or as a background refresh, which records the
+# symbols that were added to or removed from the index.
+# The snapshot is not kept in git (it is a generated binary). Without one a
+# cold start has to scrape, and fails offline. A deployment should ship one:
+# run `python constituents.py` where Wikipedia is reachable and copy the file
+# to SNAPSHOT_PATH (data/sp500_constituents.feather, or $SP500_SNAPSHOT) in the
+# image or on the volume the app starts from.
+
+WIKIPEDIA_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+SNAPSHOT_PATH = os.environ.get(
+    'SP500_SNAPSHOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sp500_constituents.feather'))
+MAX_AGE_DAYS = 7
+RETRY_SECONDS = 3600    # wait between attempts to refresh a stale snapshot after a failure
+
+last_refresh = {}
+_refresh = {'thread': None, 'failed_at': None}
+_refresh_lock = threading.Lock()
+
+
+def scrape(url=WIKIPEDIA_URL):
+    return pd.read_html(url, header=0)[0]
+
+
+def write_snapshot(df, path=SNAPSHOT_PATH, version=None):
+    # Written to a temporary file first so readers never see half a snapshot.
+    version = version or datetime.date.today().isoformat()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'version': version.encode()})
+    tmp = path + '.tmp'
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    return version
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    # (constituents, version date) from the snapshot, read through a memory map.
+    table = feather.read_table(path, memory_map=True)
+    version = (table.schema.metadata or {}).get(b'version', b'').decode()
+    return compact_constituents(table.to_pandas()), version
+
+
+def diff(old, new):
+    # Symbols added to and removed from the index between two constituent tables.
+    old_symbols, new_symbols = set(old['Symbol']), set(new['Symbol'])
+    return sorted(new_symbols - old_symbols), sorted(old_symbols - new_symbols)
+
+
+def refresh(path=SNAPSHOT_PATH, scraper=scrape):
+    # Scrape the current table, replace the snapshot and record what changed.
+    # The first snapshot has nothing to compare with and records no changes.
+    new = scraper()
+    added, removed = diff(load_snapshot(path)[0], new) if os.path.exists(path) else ([], [])
+    version = write_snapshot(new, path)
+    last_refresh.update(version=version, added=added, removed=removed, error=None)
+    return added, removed
+
+
+def snapshot_age_days(path=SNAPSHOT_PATH):
+    modified = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+    return (datetime.datetime.now() - modified).days
+
+
+def start_background_refresh(path=SNAPSHOT_PATH, scraper=scrape, max_age_days=MAX_AGE_DAYS):
+    # Refresh a stale snapshot on a daemon thread; failures (e.g. no network)
+    # are recorded in last_refresh and the existing snapshot is kept. Cheap
+    # enough to call on every rerun: it only checks the snapshot's age, runs
+    # one refresh at a time and retries a failed one after RETRY_SECONDS.
+    if os.path.exists(path) and snapshot_age_days(path) < max_age_days:
+        return None
+    with _refresh_lock:
+        thread, failed_at = _refresh['thread'], _refresh['failed_at']
+        if thread is not None and thread.is_alive():
+            return thread
+        if failed_at is not None and time.time() - failed_at < RETRY_SECONDS:
+            return None
+
+        def run():
+            try:
+                refresh(path, scraper)
+                _refresh['failed_at'] = None
+            except Exception as error:
+                last_refresh.update(error=str(error))
+                _refresh['failed_at'] = time.time()
+
+        thread = _refresh['thread'] = threading.Thread(target=run, name='constituents-refresh', daemon=True)
+        thread.start()
+        return thread
+
+
+def load_constituents(path=SNAPSHOT_PATH, scraper=scrape):
+    # Without a snapshot yet, scrape once synchronously to create it. If that
+    # fails the error is raised, and the next call tries again.
+    if not os.path.exists(path):
+        refresh(path, scraper)
+    return load_snapshot(path)
+
+
+if __name__ == '__main__':
+    # python constituents.py [snapshot path]: scrape now and report the changes.
+    added, removed = refresh(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_PATH)
+    print(f"Snapshot {last_refresh['version']}: {len(added)} added, {len(removed)} removed")
+    for symbol in added:
+        print(f'+ {symbol}')
+    for symbol in removed:
+        print(f'- {symbol}')
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Return correlations across many symbols at once.
+# For every pair (i, j) we keep running sums over the days where both symbols
+# have a return: the count, sum x_i, sum x_i^2 and sum x_i * x_j. They are built
+# from masked matrix products, so missing bars need no per-pair alignment, and
+# a new day of data only adds its own contribution to the sums.
+
+
+class CorrelationEngine:
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        size = len(self.symbols)
+        self.count = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+        self.last_close = np.full(size, np.nan)
+        self.last_date = None
+
+    @classmethod
+    def from_prices(cls, close):
+        # close: frame of closing prices, one column per symbol.
+        engine = cls(close.columns)
+        engine.extend(close)
+        return engine
+
+    def update(self, returns):
+        # Add the contribution of a (days x symbols) block of returns.
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        mask = ~np.isnan(returns)
+        values = np.where(mask, returns, 0.0)
+        mask = mask.astype(float)
+        self.count += mask.T @ mask
+        self.sum_x += values.T @ mask
+        self.sum_xx += (values ** 2).T @ mask
+        self.sum_xy += values.T @ values
+
+    def add_prices(self, close_row, date=None):
+        # One new day of closing prices (aligned with self.symbols).
+        close_row = np.asarray(close_row, dtype=float)
+        self.update(close_row / self.last_close - 1)
+        self.last_close = np.where(np.isnan(close_row), self.last_close, close_row)
+        if date is not None:
+            self.last_date = date
+
+    def extend(self, close):
+        # Add every day of close that is newer than the last one seen.
+        close = close.reindex(columns=self.symbols)
+        if self.last_date is not None:
+            close = close[close.index > self.last_date]
+        if close.empty:
+            return self
+        prices = close.to_numpy(dtype=float)
+        # Carry the last seen price forward so a symbol's first return after a
+        # missing bar spans the gap instead of being dropped.
+        filled = pd.DataFrame(np.vstack([self.last_close, prices])).ffill().to_numpy()
+        returns = prices / filled[:-1] - 1
+        self.update(returns)
+        self.last_close = filled[-1]
+        self.last_date = close.index[-1]
+        return self
+
+    def matrix(self, min_periods=20):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n = np.where(self.count >= min_periods, self.count, np.nan)
+            mean_x = self.sum_x / n
+            mean_y = mean_x.T
+            cov = self.sum_xy / n - mean_x * mean_y
+            var_x = self.sum_xx / n - mean_x ** 2
+            corr = cov / np.sqrt(var_x * var_x.T)
+        corr = np.clip(corr, -1, 1)
+        np.fill_diagonal(corr, np.where(np.diag(self.count) >= min_periods, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+
+def cluster_order(corr):
+    # Order symbols so correlated ones sit next to each other, using the angle
+    # of each symbol in the plane of the two leading eigenvectors.
+    values = np.nan_to_num(corr.to_numpy())
+    _, vectors = np.linalg.eigh(values)
+    angle = np.arctan2(vectors[:, -2], vectors[:, -1])
+    order = np.argsort(angle)
+    return corr.iloc[order, order]
+
+
+def downsample_matrix(corr, max_cells=100):
+    # Average the matrix over square blocks so it is at most max_cells per side.
+    size = len(corr)
+    if size <= max_cells:
+        return corr
+    edges = np.linspace(0, size, max_cells + 1).astype(int)
+    values = corr.to_numpy()
+    # Sum rows per block, then columns per block, and divide by the block sizes.
+    rows = np.add.reduceat(np.nan_to_num(values), edges[:-1], axis=0)
+    blocks = np.add.reduceat(rows, edges[:-1], axis=1)
+    valid = np.add.reduceat(np.add.reduceat((~np.isnan(values)).astype(float), edges[:-1], axis=0),
+                            edges[:-1], axis=1)
+    with np.errstate(invalid='ignore'):
+        blocks = blocks / valid
+    labels = [corr.index[lo] if hi - lo == 1 else f'{corr.index[lo]}..{corr.index[hi - 1]}'
+              for lo, hi in zip(edges[:-1], edges[1:])]
+    return pd.DataFrame(blocks, index=labels, columns=labels)
+
+
+def heatmap_figure(corr, max_cells=100):
+    import plotly.graph_objects as go
+    corr = downsample_matrix(cluster_order(corr), max_cells)
+    fig = go.Figure(data=go.Heatmap(z=corr.to_numpy(), x=list(corr.columns), y=list(corr.index),
+                                    colorscale='RdBu_r', zmin=-1, zmax=1))
+    fig.update_layout(height=700, yaxis_autorange='reversed')
+    return fig
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Server-side downsampling so long date ranges do not send every bar to the browser.
+# Line charts use LTTB (largest triangle three buckets) or min/max buckets, which
+# both keep peaks and troughs; candlesticks are resampled to coarser OHLC bars.
+
+DEFAULT_CHART_WIDTH = 700   # px, the default width of st.line_chart / st.plotly_chart
+POINTS_PER_PIXEL = 2        # line charts gain nothing from more than ~2 points per pixel
+PIXELS_PER_CANDLE = 4       # a candle needs a few pixels to show its body and wicks
+OHLC_RULES = ['W', 'M', 'Q']
+
+
+def line_budget(width=DEFAULT_CHART_WIDTH):
+    return int(width * POINTS_PER_PIXEL)
+
+
+def candle_budget(width=DEFAULT_CHART_WIDTH):
+    return int(width // PIXELS_PER_CANDLE)
+
+
+def lttb_indices(y, n_out):
+    # Positions of the n_out points LTTB keeps (always the first and the last).
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = pd.Series(y).ffill().bfill().to_numpy()
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Average point of every bucket, plus the last point as the final "next bucket".
+    mean_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1)
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / np.diff(edges), y[-1])
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Triangle between the previous kept point, each candidate and the next bucket's average.
+        dx, dy = mean_x[i + 1] - previous, mean_y[i + 1] - y[previous]
+        area = np.abs(dx * (y[lo:hi] - y[previous]) - dy * (np.arange(lo, hi) - previous))
+        previous = lo + int(area.argmax())
+        keep[i + 1] = previous
+    return keep
+
+
+def minmax_indices(y, n_out):
+    # Positions of the minimum and maximum of n_out // 2 equal buckets.
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    buckets = n_out // 2
+    if n <= n_out or buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    size = edges[1:] - edges[:-1]
+    # Pad every bucket to the same width so argmin/argmax run on a 2-D view.
+    width = size.max()
+    padded = np.full((buckets, width), np.nan)
+    offsets = np.arange(width)
+    positions = edges[:-1, None] + offsets
+    inside = offsets < size[:, None]
+    padded[inside] = y[positions[inside]]
+    filled = np.where(np.isnan(padded), np.inf, padded)
+    low = edges[:-1] + filled.argmin(axis=1)
+    filled = np.where(np.isnan(padded), -np.inf, padded)
+    high = edges[:-1] + filled.argmax(axis=1)
+    return np.unique(np.concatenate([[0, n - 1], low, high]))
+
+
+def downsample(data, max_points=None, method='lttb'):
+    # Downsample a Series (or every column of a frame, keeping the union of
+    # the selected rows) to about max_points rows.
+    max_points = max_points or line_budget()
+    if len(data) <= max_points:
+        return data
+    columns = [data] if isinstance(data, pd.Series) else [data[c] for c in data.columns]
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    per_column = max(max_points // len(columns), 3)
+    keep = np.unique(np.concatenate([pick(column.to_numpy(dtype=float, na_value=np.nan), per_column) for column in columns]))
+    return data.iloc[keep]
+
+
+def ohlc_rule(index, max_candles=None):
+    # Coarsest needed bar size: daily if the bars fit the budget, else weekly, monthly or quarterly.
+    max_candles = max_candles or candle_budget()
+    if len(index) <= max_candles:
+        return None
+    span_days = (index[-1] - index[0]).days
+    for rule, days in zip(OHLC_RULES, [7, 30.4, 91.3]):
+        if span_days / days <= max_candles:
+            return rule
+    return OHLC_RULES[-1]
+
+
+def resample_ohlc(data, rule):
+    # Aggregate daily OHLCV bars into rule-sized bars.
+    if rule is None:
+        return data
+    how = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last', 'Volume': 'sum'}
+    return data.resample(rule).agg({c: how[c] for c in data.columns if c in how}).dropna(subset=['Close'])
@@ -0,0 +1,64 @@
+import gzip
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Lazy, chunked exports of the constituent table and the bulk price data.
+# Nothing is generated until a download is requested; the file is then written
+# to disk chunk by chunk, so memory stays flat however many rows are exported.
+
+FORMATS = {
+    'CSV': '.csv',
+    'CSV (gzip)': '.csv.gz',
+    'Parquet': '.parquet',
+}
+CHUNK_ROWS = 50_000
+MIME_TYPES = {'.csv': 'text/csv', '.csv.gz': 'application/gzip', '.parquet': 'application/octet-stream'}
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    # An empty frame still yields one (empty) chunk so the file gets its header.
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def price_chunks(panel, symbols_per_chunk=20):
+    # Long (Date, Symbol, Open, ...) rows from a PricePanel, a few symbols at a time.
+    for start in range(0, len(panel.symbols), symbols_per_chunk):
+        yield panel.long(panel.symbols[start:start + symbols_per_chunk])
+
+
+def write_export(chunks, path, fmt):
+    # Write an iterable of frames with the same columns to path in the given format.
+    extension = FORMATS[fmt]
+    if extension == '.parquet':
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+        return path
+    opener = gzip.open if extension == '.csv.gz' else open
+    with opener(path, 'wt', newline='') as out:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(out, index=False, header=i == 0)
+    return path
+
+
+def export_file(chunks, name, fmt, directory=None):
+    # Write the export to a temporary file and return its path. The caller
+    # deletes the file; a failed export leaves nothing behind.
+    directory = directory or tempfile.gettempdir()
+    fd, path = tempfile.mkstemp(prefix=name + '-', suffix=FORMATS[fmt], dir=directory)
+    os.close(fd)
+    try:
+        return write_export(chunks, path, fmt)
+    except BaseException:
+        os.remove(path)
+        raise
+
@@ -0,0 +1,96 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+# Rendered matplotlib/seaborn figures, memoized as PNG bytes.
+# Figures are built with the object-oriented API on their own Figure, so they
+# never touch pyplot's global state, and are cleared once saved. The cache key
+# is the chart type plus a hash of the data the chart is drawn from.
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def data_key(chart_type, data):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update(','.join(map(str, data.columns)).encode())
+    return chart_type, digest.hexdigest()
+
+
+def to_png(fig, dpi=100):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    fig.clear()
+    return buffer.getvalue()
+
+
+class FigureCache:
+    # Bounded LRU of PNG bytes, shared by every session of the server.
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, chart_type, data, render):
+        # PNG for render(data), rendering it only if this chart type and data were not seen.
+        key = data_key(chart_type, data)
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        self.misses += 1
+        png = to_png(render(data))
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = png
+                self.size += len(png)
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                _, old = self.entries.popitem(last=False)
+                self.size -= len(old)
+        return png
+
+
+def sector_pie(sector_counts, donut=False):
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    colors = sns.color_palette('viridis', len(sector_counts))
+    ax.pie(sector_counts['Count'], labels=sector_counts['Sector'], autopct='%1.1f%%', startangle=140,
+           colors=colors, pctdistance=0.85 if donut else 0.6)
+    if donut:
+        ax.add_artist(Circle((0, 0), 0.70, fc='white'))
+    ax.axis('equal')
+    ax.set_title('S&P 500 Sector Distribution')
+    return fig
+
+
+def volume_scatter(filtered_data, start_date, end_date):
+    fig = Figure()
+    ax = fig.subplots()
+    # seaborn needs float NaN, not the NA of a nullable volume column; those days are left out
+    sns.scatterplot(data=filtered_data.astype({'Volume': float}), x='Date', y='Volume', hue='Close',
+                    palette='coolwarm', ax=ax)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Trading Volume')
+    ax.set_title('Scatterplot of Trading Volume Over Time')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_xlim(start_date, end_date)
+    return fig
+
+
+def correlation_heatmap(correlation_matrix):
+    fig = Figure()
+    ax = fig.subplots()
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', linewidths=0.5, ax=ax)
+    return fig
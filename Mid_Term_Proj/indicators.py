@@ -0,0 +1,211 @@
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+
+# Technical indicators that keep their own state and update in O(1) per bar.
+# Each indicator has update(...) returning the current value (NaN until it has
+# enough bars), so they can be fed streamed bars one at a time. The vectorized
+# helpers at the bottom compute many window lengths in one pass for the app.
+
+
+class SMA:
+    # Simple moving average, same as Series.rolling(window).mean().
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nans = 0
+
+    def update(self, value):
+        self.values.append(value)
+        if math.isnan(value):
+            self.nans += 1
+        else:
+            self.total += value
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old
+        if len(self.values) < self.window or self.nans:
+            return math.nan
+        return self.total / self.window
+
+
+class EMA:
+    # Exponential moving average, same as Series.ewm(span=span, adjust=False).mean().
+    # Like pandas (ignore_na=False), weights follow absolute positions: every
+    # NaN bar decays the average's weight, so the next value counts for more.
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = math.nan
+        self.weight = 1.0
+
+    def update(self, value):
+        if math.isnan(self.value):
+            self.value = value
+            return self.value
+        self.weight *= 1 - self.alpha
+        if not math.isnan(value):
+            self.value = (self.weight * self.value + self.alpha * value) / (self.weight + self.alpha)
+            self.weight = 1.0
+        return self.value
+
+
+class RollingStd:
+    # Rolling sample standard deviation, same as Series.rolling(window).std().
+    # Sums are taken of value - shift (the first value seen) to avoid cancellation.
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.shift = math.nan
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nans = 0
+
+    def update(self, value):
+        if math.isnan(self.shift):
+            self.shift = value
+        self.values.append(value)
+        if math.isnan(value):
+            self.nans += 1
+        else:
+            self.total += value - self.shift
+            self.total_sq += (value - self.shift) ** 2
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old - self.shift
+                self.total_sq -= (old - self.shift) ** 2
+        if len(self.values) < self.window or self.window < 2 or self.nans:
+            return math.nan
+        variance = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class Bollinger:
+    # Middle, upper and lower Bollinger bands (SMA +/- k rolling standard deviations).
+    def __init__(self, window=20, k=2.0):
+        self.k = k
+        self.sma = SMA(window)
+        self.std = RollingStd(window)
+
+    def update(self, value):
+        middle = self.sma.update(value)
+        std = self.std.update(value)
+        return middle, middle + self.k * std, middle - self.k * std
+
+
+class RSI:
+    # Relative strength index with Wilder smoothing of average gains and losses.
+    def __init__(self, period=14):
+        self.gain = EMA(alpha=1 / period)
+        self.loss = EMA(alpha=1 / period)
+        self.previous = math.nan
+
+    def update(self, value):
+        # NaN changes (around a NaN bar) still decay the averages, as in ewm
+        change = value - self.previous
+        self.previous = value
+        gain = self.gain.update(math.nan if math.isnan(change) else max(change, 0.0))
+        loss = self.loss.update(math.nan if math.isnan(change) else max(-change, 0.0))
+        if math.isnan(gain):
+            return math.nan
+        if loss == 0:
+            # No losses: 100, or undefined (NaN) on a flat series, as in pandas
+            return 100.0 if gain > 0 else math.nan
+        return 100 - 100 / (1 + gain / loss)
+
+
+class VWAP:
+    # Volume weighted average price of the typical price (high + low + close) / 3
+    # since the first bar (or since reset()).
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def update(self, high, low, close, volume):
+        price_volume = (high + low + close) / 3 * volume
+        if not math.isnan(price_volume):
+            self.price_volume += price_volume
+            self.volume += volume
+        return self.price_volume / self.volume if self.volume else math.nan
+
+
+class Crossover:
+    # Golden (+1) and death (-1) crosses of a short over a long moving average;
+    # 0 on bars without a cross.
+    def __init__(self, short_window=50, long_window=200):
+        self.short = SMA(short_window)
+        self.long = SMA(long_window)
+        self.above = None
+
+    def update(self, value):
+        short, long = self.short.update(value), self.long.update(value)
+        if math.isnan(short) or math.isnan(long):
+            return 0
+        above = short > long
+        signal = 0
+        if self.above is not None and above != self.above:
+            signal = 1 if above else -1
+        self.above = above
+        return signal
+
+
+def stream(indicator, values):
+    # Feed a series through a streaming indicator and collect every output.
+    return [indicator.update(value) for value in values]
+
+
+def rolling_means(values, windows):
+    # Rolling means for several windows in one pass over a cumulative sum.
+    # Returns a frame with one column per window, like rolling(w).mean().
+    series = pd.Series(values)
+    data = series.to_numpy(dtype=float)
+    missing = np.isnan(data)
+    total = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, data))])
+    nans = np.concatenate([[0], np.cumsum(missing)])
+    result = {}
+    for window in windows:
+        out = np.full(len(data), np.nan)
+        if window <= len(data):
+            sums = total[window:] - total[:-window]
+            gaps = nans[window:] - nans[:-window]
+            out[window - 1:] = np.where(gaps == 0, sums / window, np.nan)
+        result[window] = out
+    return pd.DataFrame(result, index=series.index)
+
+
+def window_means(prices, windows):
+    # rolling_means for a (days, symbols) array: a (windows, days, symbols) array.
+    prices = np.asarray(prices, dtype=float)
+    missing = np.isnan(prices)
+    start = np.zeros((1,) + prices.shape[1:])
+    total = np.concatenate([start, np.cumsum(np.where(missing, 0.0, prices), axis=0)])
+    nans = np.concatenate([start, np.cumsum(missing, axis=0)])
+    out = np.full((len(windows),) + prices.shape, np.nan)
+    for i, window in enumerate(windows):
+        if window <= len(prices):
+            sums = total[window:] - total[:-window]
+            gaps = nans[window:] - nans[:-window]
+            out[i, window - 1:] = np.where(gaps == 0, sums / window, np.nan)
+    return out
+
+
+def crossovers(short, long):
+    # Vectorized Crossover: +1 where short crosses above long, -1 where it crosses below.
+    short, long = np.asarray(short, dtype=float), np.asarray(long, dtype=float)
+    valid = ~(np.isnan(short) | np.isnan(long))
+    above = (short > long).astype(int)
+    change = np.zeros(len(short), dtype=int)
+    change[1:] = np.diff(above)
+    change[1:][~(valid[1:] & valid[:-1])] = 0
+    return change
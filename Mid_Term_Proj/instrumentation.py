@@ -0,0 +1,186 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import pyarrow as pa
+
+from price_store import DEFAULT_CACHE_DIR
+
+# Timed spans, cache hit/miss counters and payload sizes for the StockPrice app.
+# A Trace collects what happened in one rerun of one session (shown in the
+# debug panel); a Registry sums every trace of the server and writes the totals
+# as a Prometheus text file that node_exporter's textfile collector, or a
+# plain `cat`, can pick up.
+#
+# Tracing is off unless the debug panel is switched on or STOCKPRICE_METRICS=1
+# is set. A disabled trace returns straight away from every call and span()
+# hands back one shared no-op context manager, so the calls can stay in the
+# hot path.
+
+METRICS_PATH = os.environ.get('STOCKPRICE_METRICS_FILE', os.path.join(DEFAULT_CACHE_DIR, 'metrics.prom'))
+ALWAYS_ON = os.environ.get('STOCKPRICE_METRICS') == '1'
+
+NO_SPAN = nullcontext()
+
+
+def payload_size(obj):
+    # Rough number of bytes obj takes on its way to the browser.
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, pd.Series):
+        obj = obj.to_frame()
+    if isinstance(obj, pd.DataFrame):
+        # Streamlit sends tables and chart data as Arrow
+        if isinstance(obj.columns, pd.MultiIndex):
+            obj = obj.set_axis(['/'.join(map(str, column)) for column in obj.columns], axis=1)
+        return pa.Table.from_pandas(obj).nbytes
+    if hasattr(obj, 'to_json'):
+        # Plotly figures and Altair charts go out as JSON specs
+        return len(obj.to_json())
+    return sys.getsizeof(obj)
+
+
+def _labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Registry:
+    # Totals over every session of the server, keyed by (metric, labels).
+
+    TYPES = {
+        'stockprice_span_seconds': 'summary',
+        'stockprice_cache_hits_total': 'counter',
+        'stockprice_cache_misses_total': 'counter',
+        'stockprice_payload_bytes': 'summary',
+    }
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def add(self, metric, labels, value=1):
+        key = (metric, tuple(labels))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, metric, labels, value):
+        self.add(metric + '_sum', labels, value)
+        self.add(metric + '_count', labels)
+
+    def text(self):
+        # Prometheus text exposition format.
+        with self._lock:
+            values = sorted(self.values.items())
+        lines = []
+        for metric, kind in self.TYPES.items():
+            samples = [(name, labels, value) for (name, labels), value in values
+                       if name in (metric, metric + '_sum', metric + '_count')]
+            if samples:
+                lines.append(f'# TYPE {metric} {kind}')
+                lines += [f'{name}{_labels(labels)} {value:g}' for name, labels, value in samples]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path=METRICS_PATH):
+        # Replace the file in one step so a scraper never reads half of it.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.text())
+        os.replace(tmp, path)
+
+
+class Trace:
+    # Spans, cache lookups and payloads of one rerun.
+
+    def __init__(self, registry=None, enabled=False):
+        self.registry = registry
+        self.enabled = enabled and registry is not None
+        self.spans = []
+        self.caches = {}
+        self.payloads = {}
+        self._missed = set()
+
+    def record(self, name, stage, seconds):
+        if not self.enabled:
+            return
+        self.spans.append((stage, name, seconds))
+        self.registry.observe('stockprice_span_seconds', [('stage', stage), ('span', name)], seconds)
+
+    def span(self, name, stage):
+        # Context manager timing the work inside it as one span of the given stage.
+        if not self.enabled:
+            return NO_SPAN
+        return self._span(name, stage)
+
+    @contextmanager
+    def _span(self, name, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, stage, time.perf_counter() - t0)
+
+    def cache(self, cache, hit, count=1):
+        if not self.enabled or not count:
+            return
+        hits, misses = self.caches.get(cache, (0, 0))
+        self.caches[cache] = (hits + count, misses) if hit else (hits, misses + count)
+        metric = 'stockprice_cache_hits_total' if hit else 'stockprice_cache_misses_total'
+        self.registry.add(metric, [('cache', cache)], count)
+
+    def miss(self, cache):
+        # Called from the body of a cached function: it only runs on a miss.
+        if self.enabled:
+            self._missed.add(cache)
+
+    def missed(self, cache, fn):
+        # fn, marking a miss of cache whenever it actually runs.
+        if not self.enabled:
+            return fn
+
+        def run(*args, **kwargs):
+            self.miss(cache)
+            return fn(*args, **kwargs)
+        return run
+
+    @contextmanager
+    def lookup(self, cache):
+        # Count a call of a cached function whose body calls miss(cache) as a hit
+        # or a miss. Cached functions run on the calling thread, so a miss inside
+        # this block always belongs to this lookup.
+        if not self.enabled:
+            yield
+            return
+        self._missed.discard(cache)
+        yield
+        self.cache(cache, hit=cache not in self._missed)
+
+    def payload(self, name, obj):
+        # Record the size of something sent to the page; returns obj unchanged.
+        if self.enabled:
+            size = payload_size(obj)
+            self.payloads[name] = size
+            self.registry.observe('stockprice_payload_bytes', [('payload', name)], size)
+        return obj
+
+    def finish(self, started, path=METRICS_PATH):
+        # Record the whole rerun and write the server totals.
+        if not self.enabled:
+            return
+        self.record('rerun', 'total', time.perf_counter() - started)
+        self.registry.write(path)
+
+    def report(self):
+        # Rows for the debug panel.
+        spans = pd.DataFrame([(stage, name, seconds * 1000) for stage, name, seconds in self.spans],
+                             columns=['Stage', 'Span', 'ms'])
+        caches = pd.DataFrame([(cache, hits, misses) for cache, (hits, misses) in self.caches.items()],
+                              columns=['Cache', 'Hits', 'Misses'])
+        payloads = pd.DataFrame(list(self.payloads.items()), columns=['Payload', 'Bytes'])
+        return spans, caches, payloads
+
+
+OFF = Trace()
@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from compact import PricePanel, compact_prices
+
+# Local OHLCV store that sits in front of yf.download.
+# Bars are kept in SQLite keyed by (symbol, date). For every symbol we also keep
+# the date ranges that were already fetched, so a request only downloads the
+# pieces that are missing and merges them into what is stored.
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+SQL_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'STOCKPRICE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024   # evict least recently used symbols above this size
+DEFAULT_MAX_AGE = 30 * 24 * 3600        # evict symbols nobody has read for 30 days
+ROW_BYTES = 64                          # rough on-disk size of one stored bar
+
+
+def yf_downloader(symbol, start, end):
+    import yfinance as yf
+    return yf.download(symbol, start=start, end=end, progress=False)
+
+
+def _day(value):
+    return pd.Timestamp(value).normalize()
+
+
+def _iso(value):
+    return _day(value).strftime('%Y-%m-%d')
+
+
+def merge_ranges(ranges):
+    # Merge overlapping or touching [start, end) ranges.
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(start, end, covered):
+    # Parts of [start, end) not covered by the (merged) covered ranges.
+    missing = []
+    cursor = start
+    for lo, hi in merge_ranges(covered):
+        if hi <= cursor or lo >= end:
+            continue
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def failed_download(frame, start, end):
+    # Nothing back for more than a week of trading: most likely a failed
+    # download, not a range without bars, so it is not remembered as fetched.
+    # Today's bar is still moving, so a range ends at most today.
+    empty = frame is None or not len(frame)
+    return empty and min(_day(end), _day(pd.Timestamp.now())) - _day(start) > pd.Timedelta(days=7)
+
+
+class PriceStore:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, downloader=yf_downloader,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, clock=time.time):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'prices.sqlite')
+        self.downloader = downloader
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        with self._connect() as con:
+            con.executescript("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL, date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume INTEGER,
+                    PRIMARY KEY (symbol, date));
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY, last_access REAL NOT NULL, rows INTEGER NOT NULL DEFAULT 0);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _coverage(self, con, symbol):
+        rows = con.execute('SELECT start, end FROM coverage WHERE symbol = ?', (symbol,)).fetchall()
+        return [(pd.Timestamp(lo), pd.Timestamp(hi)) for lo, hi in rows]
+
+    def _symbol_lock(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def missing(self, symbol, start, end):
+        # Date ranges of [start, end) that would have to be downloaded.
+        with self._connect() as con:
+            return missing_ranges(_day(start), _day(end), self._coverage(con, symbol))
+
+    def get(self, symbol, start, end):
+        # OHLCV bars for symbol in [start, end), shaped like yf.download output.
+        start, end = _day(start), _day(end)
+        with self._symbol_lock(symbol):
+            with self._connect() as con:
+                gaps = missing_ranges(start, end, self._coverage(con, symbol))
+            if gaps:
+                self.misses += 1
+            else:
+                self.hits += 1
+            for lo, hi in gaps:
+                self.put(symbol, self.downloader(symbol, lo, hi), lo, hi)
+            with self._connect() as con:
+                data = pd.read_sql_query(
+                    'SELECT date, ' + ', '.join(SQL_COLUMNS) + ' FROM bars '
+                    'WHERE symbol = ? AND date >= ? AND date < ? ORDER BY date',
+                    con, params=(symbol, _iso(start), _iso(end)))
+                con.execute('UPDATE symbols SET last_access = ? WHERE symbol = ?', (self.clock(), symbol))
+            self.evict()
+        data.columns = ['Date'] + PRICE_COLUMNS
+        data['Date'] = pd.to_datetime(data['Date'])
+        return compact_prices(data.set_index('Date'))
+
+    def _read_many(self, symbols, start, end):
+        # Stored bars of many symbols, one row per (symbol, date).
+        start, end = _day(start), _day(end)
+        placeholders = ', '.join('?' * len(symbols))
+        with self._connect() as con:
+            data = pd.read_sql_query(
+                'SELECT symbol, date, ' + ', '.join(SQL_COLUMNS) + ' FROM bars '
+                f'WHERE symbol IN ({placeholders}) AND date >= ? AND date < ?',
+                con, params=(*symbols, _iso(start), _iso(end)))
+            con.executemany('UPDATE symbols SET last_access = ? WHERE symbol = ?',
+                            [(self.clock(), symbol) for symbol in symbols])
+        data.columns = ['Symbol', 'Date'] + PRICE_COLUMNS
+        data['Date'] = pd.to_datetime(data['Date'])
+        return data
+
+    def get_many(self, symbols, start, end):
+        # Stored bars for many symbols as one wide frame with (field, symbol)
+        # columns, like yf.download with a list of tickers. Nothing is fetched.
+        symbols = list(symbols)
+        data = compact_prices(self._read_many(symbols, start, end))
+        wide = data.pivot(index='Date', columns='Symbol', values=PRICE_COLUMNS)
+        return wide.reindex(columns=pd.MultiIndex.from_product([PRICE_COLUMNS, symbols])).sort_index()
+
+    def get_panel(self, symbols, start, end):
+        # Stored bars for many symbols as a compact PricePanel. Nothing is fetched.
+        symbols = list(symbols)
+        return PricePanel.from_long(self._read_many(symbols, start, end), symbols)
+
+    def put(self, symbol, frame, start, end):
+        # Store downloaded bars and mark [start, end) as covered. Today's bar is
+        # still moving, so coverage never extends past yesterday.
+        start, end = _day(start), _day(end)
+        rows = []
+        if frame is not None and len(frame):
+            frame = frame.reindex(columns=PRICE_COLUMNS).astype('float64')
+            table = frame.astype(object).where(frame.notna(), None)
+            table['Volume'] = frame['Volume'].astype('Int64').astype(object).where(frame['Volume'].notna(), None)
+            table.insert(0, 'date', pd.DatetimeIndex(frame.index).tz_localize(None).strftime('%Y-%m-%d'))
+            table.insert(0, 'symbol', symbol)
+            rows = list(table.itertuples(index=False, name=None))
+        covered_end = start if failed_download(frame, start, end) else min(end, _day(pd.Timestamp.now()))
+        with self._connect() as con:
+            con.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            if start < covered_end:
+                ranges = merge_ranges(self._coverage(con, symbol) + [(start, covered_end)])
+                con.execute('DELETE FROM coverage WHERE symbol = ?', (symbol,))
+                con.executemany('INSERT INTO coverage VALUES (?, ?, ?)',
+                                [(symbol, _iso(lo), _iso(hi)) for lo, hi in ranges])
+            count = con.execute('SELECT COUNT(*) FROM bars WHERE symbol = ?', (symbol,)).fetchone()[0]
+            con.execute('INSERT OR REPLACE INTO symbols VALUES (?, ?, ?)', (symbol, self.clock(), count))
+
+    def drop(self, symbol):
+        with self._connect() as con:
+            for table in ('bars', 'coverage', 'symbols'):
+                con.execute(f'DELETE FROM {table} WHERE symbol = ?', (symbol,))
+
+    def size(self):
+        with self._connect() as con:
+            return con.execute('SELECT COALESCE(SUM(rows), 0) FROM symbols').fetchone()[0] * ROW_BYTES
+
+    def evict(self):
+        # Drop symbols older than max_age, then least recently used ones until under max_bytes.
+        with self._connect() as con:
+            entries = con.execute('SELECT symbol, last_access, rows FROM symbols ORDER BY last_access').fetchall()
+        total = sum(rows for _, _, rows in entries) * ROW_BYTES
+        now = self.clock()
+        evicted = []
+        for symbol, last_access, rows in entries:
+            if now - last_access <= self.max_age and total <= self.max_bytes:
+                break
+            evicted.append(symbol)
+            total -= rows * ROW_BYTES
+        for symbol in evicted:
+            self.drop(symbol)
+        return evicted
+
+
+class PriceRequests:
+    # Collects every (symbol, range) a rerun needs, merges overlapping ranges of
+    # the same symbol, downloads what the store is missing for all symbols in
+    # one batch and slices the result back out per view.
+    # batch_downloader(symbols, start, end) -> {symbol: frame} (bulk_loader's
+    # yf_batch_downloader); the batch spans every missing range, the extra days
+    # are stored too. Symbols it brings nothing back for, or every symbol
+    # without one, are downloaded one by one through the store.
+    # saved counts the downloads avoided: one per missing piece of every
+    # request on its own, less the downloads made.
+
+    def __init__(self, store, batch_downloader=None):
+        self.store = store
+        self.batch_downloader = batch_downloader
+        self.wanted = {}
+        self.results = {}
+        self.fetches = 0
+        self.saved = 0
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, name, symbol, start, end):
+        self.wanted[name] = (symbol, _day(start), _day(end))
+
+    def _download_batch(self, gaps):
+        # One download of every symbol in gaps ({symbol: missing ranges}) over
+        # the span of all the ranges.
+        start = min(ranges[0][0] for ranges in gaps.values())
+        end = max(ranges[-1][1] for ranges in gaps.values())
+        frames = self.batch_downloader(list(gaps), start, end)
+        for symbol in gaps:
+            if not failed_download(frames.get(symbol), start, end):
+                self.store.put(symbol, frames.get(symbol), start, end)
+
+    def fetch(self):
+        by_symbol = {}
+        for symbol, start, end in self.wanted.values():
+            by_symbol.setdefault(symbol, []).append((start, end))
+        separate = sum(len(self.store.missing(symbol, start, end)) for symbol, start, end in self.wanted.values())
+        merged = {symbol: merge_ranges(ranges) for symbol, ranges in by_symbol.items()}
+        gaps = {}
+        for symbol, ranges in merged.items():
+            missing = [self.store.missing(symbol, lo, hi) for lo, hi in ranges]
+            self.misses += sum(bool(pieces) for pieces in missing)
+            self.hits += sum(not pieces for pieces in missing)
+            if any(missing):
+                gaps[symbol] = [piece for pieces in missing for piece in pieces]
+        downloads = 0
+        if gaps and self.batch_downloader is not None:
+            self._download_batch(gaps)
+            downloads += 1
+        frames = {}
+        for symbol, ranges in merged.items():
+            downloads += sum(len(self.store.missing(symbol, lo, hi)) for lo, hi in ranges)
+            frames[symbol] = pd.concat([self.store.get(symbol, lo, hi) for lo, hi in ranges])
+        self.fetches += downloads
+        self.saved += max(separate - downloads, 0)
+        for name, (symbol, start, end) in self.wanted.items():
+            data = frames[symbol]
+            self.results[name] = data[(data.index >= start) & (data.index < end)].copy()
+        return self.results
+
+    def __getitem__(self, name):
+        return self.results[name]
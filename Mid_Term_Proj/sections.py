@@ -0,0 +1,31 @@
+from instrumentation import OFF
+
+# Page sections that only re-execute when their inputs change.
+# Streamlit re-runs the whole script on every widget change. Each section here
+# declares its widget inputs and the upstream sections it reads from; its result
+# is kept in session state and reused until one of those changes, so a widget
+# change only recomputes the sections downstream of it. Inputs must be plain
+# comparable values (strings, numbers, dates, tuples), not frames.
+
+
+class Sections:
+    def __init__(self, state, key='_sections', trace=OFF):
+        self.cache = state.setdefault(key, {})
+        self.trace = trace
+
+    def run(self, name, compute, inputs=(), after=(), stage='compute'):
+        # Result of compute(), recomputed only if inputs or an upstream section changed.
+        key = (tuple(inputs), tuple(self.cache[upstream]['version'] for upstream in after))
+        entry = self.cache.get(name)
+        recomputed = entry is None or entry['key'] != key
+        if recomputed:
+            with self.trace.span(name, stage):
+                version = entry['version'] + 1 if entry else 0
+                entry = {'key': key, 'value': compute(), 'version': version}
+            self.cache[name] = entry
+        self.trace.cache('section ' + name, hit=not recomputed)
+        return entry['value']
+
+    def timed(self, name):
+        # Time work that runs on every rerun anyway, such as sending elements to the page.
+        return self.trace.span(name, 'render')
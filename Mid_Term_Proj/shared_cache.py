@@ -0,0 +1,368 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+from price_store import DEFAULT_CACHE_DIR
+
+# Cache shared by every session and every replica of the app, in front of the
+# slow fetches (Yahoo downloads, the Wikipedia scrape).
+# A fetch for a key that is not cached takes a lock first, so when many
+# sessions or replicas ask for the same symbol and range at once, one of them
+# fetches and the others wait and read its result (single flight).
+#
+# A backend stores bytes under string keys and needs four operations, the same
+# as Redis GET / SET EX / SET NX EX / compare-and-delete:
+#   get(key) -> bytes or None
+#   set(key, value, ttl)          ttl in seconds, None for no expiry
+#   add(key, value, ttl) -> bool  set only if the key is absent (or expired)
+#   delete(key, value=None)       delete, only if it still holds value if given
+# SQLiteBackend and FileBackend work for replicas on one host or a shared
+# volume, and drop their oldest entries beyond max_bytes; RedisBackend wraps a
+# redis-py client for anything bigger (size it with Redis' own maxmemory).
+# STOCKPRICE_SHARED_CACHE picks one: a redis:// URL, a directory, or a SQLite
+# file (the default, in the app's cache directory).
+#
+# Nothing is kept forever: values without a ttl expire after DEFAULT_TTL.
+# Results that look like a failed fetch (empty, or missing some of what was
+# asked for) are only shared for RETRY_TTL, so a retry comes soon.
+
+MARKET_TZ = 'America/New_York'
+MARKET_OPEN = pd.Timedelta(hours=9, minutes=30)
+MARKET_CLOSE = pd.Timedelta(hours=16)
+LIVE_TTL = 60               # today's bars while the market is open
+LOCK_LEASE = 120            # a lock whose holder died is given up after this
+LOCK_WAIT = 180             # waiters give up on the lock and fetch themselves after this
+POLL_SECONDS = 0.05
+DEFAULT_TTL = 7 * 24 * 3600
+RETRY_TTL = 30
+DOWNLOAD_TTL = 600          # downloads end up in the PriceStore; share them just long enough to coalesce
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def next_open(now):
+    day = now.normalize()
+    if now >= day + MARKET_OPEN:
+        day += pd.Timedelta(days=1)
+    while day.dayofweek >= 5:
+        day += pd.Timedelta(days=1)
+    return day + MARKET_OPEN
+
+
+def market_ttl(end, now=None):
+    # How long data for days before `end` (exclusive) stays valid. Bars of past
+    # days never change: None. A range that includes today expires every
+    # LIVE_TTL seconds while the market is open, and otherwise at the next open.
+    # Exchange holidays are treated as trading days.
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else now
+    if pd.Timestamp(end).normalize() <= now.normalize().tz_localize(None):
+        return None
+    if now.dayofweek < 5 and MARKET_OPEN <= now - now.normalize() < MARKET_CLOSE:
+        return LIVE_TTL
+    return (next_open(now) - now).total_seconds()
+
+
+def download_ttl(symbols, start, end):
+    # How long to share a download of [start, end), for memoize.
+    return min(market_ttl(end) or DOWNLOAD_TTL, DOWNLOAD_TTL)
+
+
+def download_complete(frames, symbols, start, end):
+    # Whether a batch download ({symbol: frame}) has bars for every symbol,
+    # for memoize. yfinance reports failures by leaving symbols out or empty.
+    return all(len(frames.get(symbol, ())) for symbol in symbols)
+
+
+def found(value):
+    # Default completeness check of memoize: not None, not empty, and for a
+    # dict every value found.
+    if value is None:
+        return False
+    if isinstance(value, dict):
+        return bool(value) and all(found(item) for item in value.values())
+    return not hasattr(value, '__len__') or len(value) > 0
+
+
+def _expires(ttl):
+    return None if ttl is None else time.time() + ttl
+
+
+class SQLiteBackend:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        with self._connect() as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('CREATE TABLE IF NOT EXISTS entries '
+                        '(key TEXT PRIMARY KEY, value BLOB, expires REAL, stored REAL)')
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def get(self, key):
+        with self._connect() as con:
+            row = con.execute('SELECT value FROM entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                              (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        with self._connect() as con:
+            # Expired entries are only overwritten by keys of the same range; drop them here
+            con.execute('DELETE FROM entries WHERE expires <= ?', (time.time(),))
+            con.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', (key, value, _expires(ttl), time.time()))
+            self._shrink(con)
+
+    def _shrink(self, con):
+        # Drop the oldest entries until the values fit in max_bytes.
+        excess = con.execute('SELECT COALESCE(SUM(LENGTH(value)), 0) FROM entries').fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        oldest = []
+        for key, size in con.execute('SELECT key, LENGTH(value) FROM entries ORDER BY stored'):
+            if excess <= 0:
+                break
+            oldest.append((key,))
+            excess -= size
+        con.executemany('DELETE FROM entries WHERE key = ?', oldest)
+
+    def add(self, key, value, ttl=None):
+        with self._connect() as con:
+            con.execute('DELETE FROM entries WHERE key = ? AND expires <= ?', (key, time.time()))
+            return con.execute('INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)',
+                               (key, value, _expires(ttl), time.time())).rowcount == 1
+
+    def delete(self, key, value=None):
+        with self._connect() as con:
+            if value is None:
+                con.execute('DELETE FROM entries WHERE key = ?', (key,))
+            else:
+                con.execute('DELETE FROM entries WHERE key = ? AND value = ?', (key, value))
+
+
+class FileBackend:
+    # One file per key: an 8-byte expiry time (inf for never) and the value.
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _load(self, path):
+        # The whole file, expiry included, or None.
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _read(self, path):
+        data = self._load(path)
+        if data is None:
+            return None
+        expires, = struct.unpack('d', data[:8])
+        return data[8:] if expires > time.time() else None
+
+    def _expired(self, path):
+        try:
+            with open(path, 'rb') as f:
+                expires, = struct.unpack('d', f.read(8))
+        except (FileNotFoundError, struct.error):
+            return False
+        return expires <= time.time()
+
+    def _encode(self, value, ttl):
+        return struct.pack('d', float('inf') if ttl is None else _expires(ttl)) + value
+
+    def get(self, key):
+        return self._read(self._path(key))
+
+    def _write_tmp(self, path, value, ttl):
+        # Files are written aside and then moved or linked into place, so a
+        # reader never sees one half-written.
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._encode(value, ttl))
+        return tmp
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        os.replace(self._write_tmp(path, value, ttl), path)
+        self._shrink()
+
+    def _shrink(self):
+        # Drop expired files, then the oldest ones until the rest fit in max_bytes.
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes and not self._expired(path):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _remove_if(self, path, data):
+        # Remove the file only if it still holds data. It is moved aside first
+        # and linked back if it turns out to be another one, so a file that
+        # replaced data since it was read is never removed.
+        aside = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:
+            return
+        try:
+            if self._load(aside) != data:
+                try:
+                    os.link(aside, path)
+                except FileExistsError:
+                    pass
+        finally:
+            os.remove(aside)
+
+    def add(self, key, value, ttl=None):
+        path = self._path(key)
+        stale = self._load(path)
+        if stale is not None and struct.unpack('d', stale[:8])[0] <= time.time():
+            # Expired: take it over, unless someone else already has
+            self._remove_if(path, stale)
+        tmp = self._write_tmp(path, value, ttl)
+        try:
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp)
+
+    def delete(self, key, value=None):
+        path = self._path(key)
+        if value is None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        data = self._load(path)
+        if data is not None and data[8:] == value:
+            self._remove_if(path, data)
+
+
+class RedisBackend:
+    # Adapter for a redis-py client (or anything with the same get/set/delete/eval).
+
+    RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=None if ttl is None else max(1, int(ttl)))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, ex=None if ttl is None else max(1, int(ttl)), nx=True))
+
+    def delete(self, key, value=None):
+        if value is None:
+            self.client.delete(key)
+        else:
+            self.client.eval(self.RELEASE, 1, key, value)
+
+
+def backend_from_env(default_dir=DEFAULT_CACHE_DIR):
+    location = os.environ.get('STOCKPRICE_SHARED_CACHE', os.path.join(default_dir, 'shared_cache.sqlite'))
+    if location.startswith('redis://') or location.startswith('rediss://'):
+        import redis
+        return RedisBackend(redis.Redis.from_url(location))
+    if location.endswith(('.sqlite', '.db')):
+        return SQLiteBackend(location)
+    return FileBackend(location)
+
+
+class SharedCache:
+    def __init__(self, backend, default_ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @contextmanager
+    def lock(self, key):
+        # Held by one caller across all sessions and replicas. Waiters give up
+        # after LOCK_WAIT seconds rather than hang on a stuck fetch.
+        token = uuid.uuid4().hex.encode()
+        deadline = time.monotonic() + LOCK_WAIT
+        acquired = False
+        while not acquired and time.monotonic() < deadline:
+            acquired = self.backend.add('lock:' + key, token, LOCK_LEASE)
+            if not acquired:
+                time.sleep(POLL_SECONDS)
+        try:
+            yield
+        finally:
+            if acquired:
+                self.backend.delete('lock:' + key, token)
+
+    def get_or_fetch(self, key, fetch, ttl=None, complete=found):
+        # Cached value of fetch() under key; at most one caller fetches at a
+        # time. ttl None means default_ttl; a value complete() rejects is only
+        # kept for RETRY_TTL.
+        cached = self.backend.get(key)
+        if cached is None:
+            with self.lock(key):
+                # Whoever held the lock before us may have just fetched it
+                cached = self.backend.get(key)
+                if cached is None:
+                    self._count(hit=False)
+                    value = fetch()
+                    ttl = self.default_ttl if ttl is None else ttl
+                    if not complete(value):
+                        ttl = min(ttl, RETRY_TTL)
+                    self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+                    return value
+        self._count(hit=True)
+        return pickle.loads(cached)
+
+    def memoize(self, name, fetch, ttl=None, complete=None):
+        # fetch(*args) through the cache. ttl is seconds, None, or a function of
+        # the same arguments returning either; complete(value, *args) tells a
+        # full result from a failed or partial one (default: found(value)).
+        def cached(*args):
+            return self.get_or_fetch(f'{name}:{args!r}', lambda: fetch(*args), ttl(*args) if callable(ttl) else ttl,
+                                     found if complete is None else lambda value: complete(value, *args))
+        return cached
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Near-real-time price stream for the price panel.
+# A producer coroutine reads bars from a pluggable source and appends them to a
+# fixed-size ring buffer. The page polls the buffer and appends only the bars
+# it has not shown yet to its charts, so history is never fetched again and the
+# script is not rerun. All producers of the server share one event loop on a
+# daemon thread. A producer stops by itself once nothing has polled its buffer
+# for LEASE_SECONDS, e.g. because the browser tab that started it was closed.
+#
+# A source is any object with an async generator method bars(symbol) that
+# yields frames of new bars (DatetimeIndex, BAR_COLUMNS), oldest first.
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_CAPACITY = 2000     # about five trading days of one-minute bars
+REFRESH_SECONDS = 0.5       # how often the page looks for new bars
+LEASE_SECONDS = 60          # a producer nobody polls for this long is stopped
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    # The shared event loop, started on first use.
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='price-streams', daemon=True).start()
+        return _loop
+
+
+class RingBuffer:
+    # The last `capacity` bars; `total` counts every bar ever appended, so a
+    # reader that remembers how many it has seen can ask for just the rest.
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, columns=BAR_COLUMNS):
+        self.capacity = capacity
+        self.columns = list(columns)
+        self.times = np.zeros(capacity, dtype='datetime64[ns]')
+        self.values = np.full((capacity, len(self.columns)), np.nan)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def append(self, bars):
+        if not len(bars):
+            return
+        kept = bars.iloc[-self.capacity:]
+        times = kept.index.values.astype('datetime64[ns]')
+        values = kept[self.columns].to_numpy(dtype=float, na_value=np.nan)
+        with self._lock:
+            self.total += len(bars)
+            slots = np.arange(self.total - len(kept), self.total) % self.capacity
+            self.times[slots] = times
+            self.values[slots] = values
+
+    def since(self, seen):
+        # Bars after the first `seen` that are still in the buffer, and the new total.
+        with self._lock:
+            slots = np.arange(max(seen, self.total - self.capacity), self.total) % self.capacity
+            times, values, total = self.times[slots], self.values[slots], self.total
+        return pd.DataFrame(values, index=pd.DatetimeIndex(times, name='Date'), columns=self.columns), total
+
+
+class YahooSource:
+    # Polls Yahoo Finance for today's intraday bars and yields the completed
+    # bars it has not yielded before. The last bar of a download is still
+    # forming, so it is held back until the next bar starts.
+
+    def __init__(self, interval='1m', poll_seconds=30):
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+
+    def download(self, symbol):
+        import yfinance as yf
+        data = yf.download(symbol, period='1d', interval=self.interval, progress=False)
+        if data.index.tz is not None:
+            data.index = data.index.tz_convert('America/New_York').tz_localize(None)
+        return data.rename_axis('Date')
+
+    async def bars(self, symbol):
+        last = None
+        while True:
+            data = (await asyncio.to_thread(self.download, symbol)).iloc[:-1]
+            if last is not None:
+                data = data[data.index > last]
+            if len(data):
+                last = data.index[-1]
+                yield data
+            await asyncio.sleep(self.poll_seconds)
+
+
+class ReplaySource:
+    # Replays recorded bars `speed` times faster than they happened. Gaps such as
+    # nights and weekends are cut to at most max_gap seconds; bars less than
+    # min_gap seconds apart are yielded together, so speed=float('inf')
+    # replays everything as fast as the consumer takes it.
+
+    def __init__(self, bars, speed=60.0, max_gap=1.0, min_gap=0.01):
+        self.recorded = bars[BAR_COLUMNS]
+        self.speed = speed
+        self.max_gap = max_gap
+        self.min_gap = min_gap
+
+    async def bars(self, symbol):
+        gaps = np.diff(self.recorded.index.values).astype('timedelta64[ns]').astype(np.int64) / 1e9 / self.speed
+        waits = np.flatnonzero(gaps >= self.min_gap)
+        start = 0
+        for i in waits:
+            yield self.recorded.iloc[start:i + 1]
+            await asyncio.sleep(min(gaps[i], self.max_gap))
+            start = i + 1
+        yield self.recorded.iloc[start:]
+
+
+class Streamer:
+    # Feeds source.bars(symbol) into a ring buffer until stopped, the source
+    # ends or nobody has called poll() for `lease` seconds.
+
+    def __init__(self, source, symbol, capacity=DEFAULT_CAPACITY, lease=LEASE_SECONDS):
+        self.source = source
+        self.symbol = symbol
+        self.buffer = RingBuffer(capacity)
+        self.lease = lease
+        self.polled = time.monotonic()
+        self.error = None
+        self.expired = False
+        self.done = False
+        self._future = None
+
+    def start(self):
+        self.polled = time.monotonic()
+        self._future = asyncio.run_coroutine_threadsafe(self._produce(), event_loop())
+        return self
+
+    def poll(self, seen):
+        # buffer.since(seen), renewing the lease.
+        self.polled = time.monotonic()
+        return self.buffer.since(seen)
+
+    async def _feed(self):
+        try:
+            async for bars in self.source.bars(self.symbol):
+                self.buffer.append(bars)
+        except Exception as error:
+            self.error = error
+
+    async def _produce(self):
+        feed = asyncio.ensure_future(self._feed())
+        try:
+            while not feed.done():
+                await asyncio.wait([feed], timeout=self.lease / 4)
+                if not feed.done() and time.monotonic() - self.polled > self.lease:
+                    self.expired = True
+                    feed.cancel()
+        finally:
+            feed.cancel()
+            self.done = True
+
+    def stop(self):
+        if self._future is not None:
+            self._future.cancel()
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Paginated views of large tables.
+# The frame is converted once into an Arrow table; sorting, filtering and column
+# selection run on the server and only the rows of the visible page are turned
+# back into a (small) frame for the browser. The row order of every
+# (filter, sort) query is cached, so paging through a result or switching
+# back to an earlier query is a take() of one page.
+
+DEFAULT_PAGE_ROWS = 50
+DEFAULT_COLUMNS = 20    # columns shown until others are picked; bulk price tables have one per company
+MAX_QUERIES = 32
+
+
+class TableStore:
+    def __init__(self, frame, max_queries=MAX_QUERIES):
+        if not isinstance(frame.index, pd.RangeIndex):
+            frame = frame.reset_index()
+        frame = frame.set_axis([str(column) for column in frame.columns], axis=1)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        # Categorical columns arrive as dictionary arrays, which Arrow cannot sort: decode them
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table[i].cast(field.type.value_type))
+        self.table = table
+        self.columns = self.table.column_names
+        self.max_queries = max_queries
+        self.queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def rows(self, sort_by=None, descending=False, filter_column=None, filter_text=''):
+        # Row numbers matching the filter, in sort order.
+        key = (sort_by, descending, filter_column, filter_text)
+        with self._lock:
+            if key in self.queries:
+                self.queries.move_to_end(key)
+                return self.queries[key]
+        if filter_column and filter_text:
+            # Case-insensitive substring match on the column as text, so dates and
+            # numbers can be filtered the same way as names
+            text = pc.cast(self.table[filter_column], pa.string())
+            rows = pc.indices_nonzero(pc.fill_null(pc.match_substring(text, filter_text, ignore_case=True), False))
+        else:
+            rows = pa.array(np.arange(len(self), dtype=np.uint64))
+        if sort_by:
+            order = pc.array_sort_indices(self.table[sort_by].take(rows),
+                                          order='descending' if descending else 'ascending')
+            rows = rows.take(order)
+        with self._lock:
+            self.queries[key] = rows
+            while len(self.queries) > self.max_queries:
+                self.queries.popitem(last=False)
+        return rows
+
+    def page(self, page, page_rows=DEFAULT_PAGE_ROWS, columns=None, **query):
+        # Frame with the given (0-based) page of the query result, and the number of matching rows.
+        rows = self.rows(**query)
+        start = page * page_rows
+        shown = self.table.select(columns or self.columns).take(rows[start:start + page_rows])
+        return shown.to_pandas(), len(rows)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app's modules and the benchmark fakes are imported by their plain names,
+# as the app and the benchmarks do.
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
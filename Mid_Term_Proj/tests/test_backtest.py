@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import STATS, crossover_grid, grid_summary, window_pairs
+from fakes import FakePriceSource
+
+
+def loop_backtest(prices, short, long):
+    # The crossover rule day by day: a signal seen at one close is traded at
+    # the next close.
+    prices = prices.ffill()
+    signal = prices.rolling(short).mean() > prices.rolling(long).mean()
+    returns = (prices / prices.shift() - 1).fillna(0)
+    equity = peak = 1.0
+    drawdown, trades, days_held, holding, pending = 0.0, 0, 0, False, False
+    for day in range(len(prices)):
+        if holding:
+            equity *= 1 + returns.iloc[day]
+            days_held += 1
+        peak = max(peak, equity)
+        drawdown = max(drawdown, 1 - equity / peak)
+        trades += pending and not holding
+        holding, pending = pending, signal.iloc[day]
+    return {'total_return': equity - 1, 'buy_and_hold': (1 + returns).prod() - 1, 'max_drawdown': drawdown,
+            'trades': trades, 'exposure': days_held / len(prices)}
+
+
+@pytest.fixture(scope='module')
+def close():
+    source = FakePriceSource()
+    close = pd.DataFrame({symbol: source.bars(symbol, '2020-01-01', '2021-07-01')['Close']
+                          for symbol in ['AAA', 'BBB', 'CCC']})
+    close.iloc[:30, 1] = np.nan         # BBB starts late
+    close.iloc[100:104, 2] = np.nan     # CCC has a gap
+    return close
+
+
+def test_window_pairs():
+    assert window_pairs([5, 20], [10, 20, 50]) == [(5, 10), (5, 20), (5, 50), (20, 50)]
+
+
+@pytest.mark.parametrize('block_cells', [10 ** 9, 1])
+def test_grid_matches_the_loop(close, block_cells):
+    results = crossover_grid(close, [3, 10], [5, 20, 50], block_cells=block_cells)
+    assert list(results.columns) == STATS
+    assert len(results) == 5 * len(close.columns)
+    for (short, long, symbol), row in results.iterrows():
+        expected = loop_backtest(close[symbol], short, long)
+        for name in STATS:
+            assert row[name] == pytest.approx(expected[name], rel=1e-5, abs=1e-5), (short, long, symbol, name)
+        assert expected['trades'] > 0
+
+
+def test_trades_at_the_close_after_the_signal():
+    # The 1 / 2 day averages cross at the close of day 3 (9 > 8.5); the stock is
+    # bought at the close of day 4 and earns from 10 to 12.
+    close = pd.DataFrame({'A': [10.0, 9, 8, 9, 10, 11, 12]})
+    row = crossover_grid(close, [1], [2]).iloc[0]
+    assert row['total_return'] == pytest.approx(12 / 10 - 1, rel=1e-6)
+    assert row['trades'] == 1
+
+
+def test_grid_summary_is_the_median_over_symbols(close):
+    results = crossover_grid(close, [3], [5, 20])
+    summary = grid_summary(results)
+    assert list(summary.index) == [(3, 5), (3, 20)]
+    assert summary.loc[(3, 5), 'total_return'] == pytest.approx(results.loc[(3, 5), 'total_return'].median())
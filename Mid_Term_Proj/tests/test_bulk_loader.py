@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_loader import load_bulk, plan_batches, with_retry
+from fakes import FakePriceSource
+from price_store import PriceStore
+
+D = pd.Timestamp
+
+
+class FlakySource(FakePriceSource):
+    # Batch downloads that leave out the symbols in drop, or return them empty,
+    # for their first `times` requests (forever for None), and raise for the
+    # first `errors` requests. Remembers every batch it was asked for.
+    def __init__(self, drop=(), times=None, empty=False, errors=0):
+        super().__init__()
+        self.drop, self.times, self.empty, self.errors = set(drop), times, empty, errors
+        self.batches = []
+
+    def download_batch(self, symbols, start, end):
+        self.batches.append(list(symbols))
+        if len(self.batches) <= self.errors:
+            raise ConnectionError('rate limited')
+        frames = super().download_batch(symbols, start, end)
+        if self.times is None or len(self.batches) <= self.errors + self.times:
+            for symbol in self.drop & set(symbols):
+                if self.empty:
+                    frames[symbol] = frames[symbol].iloc[:0]
+                else:
+                    del frames[symbol]
+        return frames
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(cache_dir=str(tmp_path), downloader=FakePriceSource().download)
+
+
+def load(store, source, symbols, **kwargs):
+    return load_bulk(store, symbols, '2020-01-01', '2021-01-01', source.download_batch,
+                     max_workers=1, sleep=lambda seconds: None, **kwargs)
+
+
+def test_with_retry_backs_off_exponentially():
+    sleeps, calls = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError
+        return 'ok'
+
+    assert with_retry(flaky, retries=3, backoff=0.5, sleep=sleeps.append) == 'ok'
+    assert sleeps == [0.5, 1.0]
+
+
+def test_with_retry_gives_up():
+    sleeps = []
+
+    def down():
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        with_retry(down, retries=2, backoff=1, sleep=sleeps.append)
+    assert sleeps == [1, 2]
+
+
+def test_plan_batches_groups_symbols_by_missing_range(store):
+    store.get('AAA', '2020-01-01', '2020-07-01')
+    batches = plan_batches(store, ['AAA', 'BBB', 'CCC', 'DDD'], '2020-01-01', '2021-01-01', batch_size=2)
+    assert batches == [(['AAA'], D('2020-07-01'), D('2021-01-01')),
+                       (['BBB', 'CCC'], D('2020-01-01'), D('2021-01-01')),
+                       (['DDD'], D('2020-01-01'), D('2021-01-01'))]
+
+
+def test_load_bulk(store):
+    source = FlakySource()
+    panel, failed = load(store, source, ['AAA', 'BBB', 'CCC', 'AAA'], batch_size=2)
+    assert failed == []
+    assert list(panel.symbols) == ['AAA', 'BBB', 'CCC']
+    assert source.batches == [['AAA', 'BBB'], ['CCC']]
+    expected = source.bars('BBB', '2020-01-01', '2021-01-01')['Close']
+    np.testing.assert_allclose(panel.wide('Close')['BBB'], expected, rtol=1e-6)
+    load(store, source, ['AAA', 'BBB', 'CCC'])
+    assert len(source.batches) == 2     # everything is stored now
+
+
+@pytest.mark.parametrize('empty', [False, True], ids=['left out', 'empty'])
+def test_missing_symbols_are_retried_alone(store, empty):
+    source = FlakySource(drop=['BAD'], times=1, empty=empty)
+    panel, failed = load(store, source, ['AAA', 'BAD', 'CCC'])
+    assert failed == []
+    assert source.batches == [['AAA', 'BAD', 'CCC'], ['BAD']]
+    assert panel.wide('Close')['BAD'].notna().all()
+
+
+@pytest.mark.parametrize('empty', [False, True], ids=['left out', 'empty'])
+def test_symbols_that_never_come_are_reported(store, empty):
+    source = FlakySource(drop=['BAD'], empty=empty)
+    panel, failed = load(store, source, ['AAA', 'BAD'], retries=2)
+    assert failed == ['BAD']
+    assert source.batches == [['AAA', 'BAD'], ['BAD'], ['BAD']]
+    assert store.missing('BAD', '2020-01-01', '2021-01-01')
+    assert not store.missing('AAA', '2020-01-01', '2021-01-01')
+
+
+def test_raising_batches_are_retried(store):
+    source = FlakySource(errors=2)
+    assert load(store, source, ['AAA', 'BBB'])[1] == []
+    assert len(source.batches) == 3
+    assert load(store, FlakySource(errors=10), ['CCC'], retries=1)[1] == ['CCC']
+
+
+def test_short_empty_range_is_not_a_failure(store):
+    # A weekend has no bars
+    source = FlakySource(drop=['AAA'], empty=True)
+    assert load_bulk(store, ['AAA'], '2020-01-04', '2020-01-06', source.download_batch)[1] == []
+    assert len(source.batches) == 1
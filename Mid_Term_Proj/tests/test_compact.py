@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from compact import PricePanel, compact_prices, compact_volume
+from fakes import FakePriceSource
+
+
+def bars_with_gaps(symbol, start='2020-01-01', end='2020-03-01'):
+    bars = FakePriceSource().bars(symbol, start, end)
+    bars['Volume'] = bars['Volume'].astype(float)
+    bars.iloc[::5, bars.columns.get_loc('Volume')] = np.nan
+    return bars
+
+
+def test_compact_volume_keeps_missing_values():
+    volume = compact_volume([1.0, np.nan, 3.0])
+    assert str(volume.dtype) == 'Int32'
+    assert volume.isna().tolist() == [False, True, False]
+    assert str(compact_volume([2.0 ** 33]).dtype) == 'Int64'
+    assert str(compact_volume([]).dtype) == 'Int32'
+
+
+def test_compact_prices():
+    bars = bars_with_gaps('AAA')
+    compact = compact_prices(bars)
+    assert compact['Close'].dtype == np.float32
+    np.testing.assert_allclose(compact['Close'], bars['Close'], rtol=1e-6)
+    assert (compact['Volume'].isna() == bars['Volume'].isna()).all()
+
+
+def test_price_panel_round_trip():
+    frames = {'AAA': bars_with_gaps('AAA'), 'BBB': bars_with_gaps('BBB', start='2020-02-01')}
+    long = pd.concat([frame.assign(Symbol=symbol) for symbol, frame in frames.items()]).rename_axis('Date').reset_index()
+    panel = PricePanel.from_long(long, ['AAA', 'BBB'])
+    for symbol, frame in frames.items():
+        got = panel.get(symbol)
+        assert (got.index == frame.index).all()
+        assert (got['Volume'].isna().to_numpy() == frame['Volume'].isna().to_numpy()).all()
+    volume = panel.wide('Volume')
+    assert volume['BBB'].loc[:'2020-01-31'].isna().all()
+    pd.testing.assert_series_equal(volume['AAA'].dropna(), frames['AAA']['Volume'].dropna(),
+                                   check_names=False, check_freq=False, check_index_type=False)
+    assert len(panel.long(['BBB'])) == len(frames['BBB'])
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationEngine, cluster_order, downsample_matrix
+
+# Incremental updates against a full recompute and against pandas, on prices
+# with missing bars: a symbol that starts late, single gaps and a run of gaps.
+
+
+@pytest.fixture(scope='module')
+def close():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    common = rng.standard_normal(300)
+    returns = 0.01 * (common[:, None] + rng.standard_normal((300, 5)))
+    close = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates, columns=list('ABCDE'))
+    close.iloc[:40, 1] = np.nan
+    close.iloc[[10, 150, 151, 152, 299], 2] = np.nan
+    close.iloc[200, [0, 3]] = np.nan
+    close.iloc[250:, 4] = np.nan
+    return close
+
+
+def pandas_corr(close):
+    # Returns over gaps span the missing bars; a day without a bar has no return.
+    filled = close.ffill()
+    return (filled / filled.shift() - 1).where(close.notna()).corr(min_periods=20)
+
+
+def test_from_prices_matches_pandas(close):
+    matrix = CorrelationEngine.from_prices(close).matrix()
+    pd.testing.assert_frame_equal(matrix, pandas_corr(close), rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize('split', [1, 41, 151, 299])
+def test_extend_in_two_steps_matches_a_full_recompute(close, split):
+    engine = CorrelationEngine(close.columns)
+    engine.extend(close.iloc[:split])
+    engine.extend(close)            # days already seen are skipped
+    assert engine.last_date == close.index[-1]
+    full = CorrelationEngine.from_prices(close).matrix()
+    pd.testing.assert_frame_equal(engine.matrix(), full, rtol=1e-10, atol=1e-12)
+
+
+def test_add_prices_matches_a_full_recompute(close):
+    engine = CorrelationEngine.from_prices(close.iloc[:100])
+    for date, row in close.iloc[100:].iterrows():
+        engine.add_prices(row.to_numpy(), date)
+    assert engine.last_date == close.index[-1]
+    pd.testing.assert_frame_equal(engine.matrix(), pandas_corr(close), rtol=1e-10, atol=1e-12)
+
+
+def test_too_few_common_days_is_nan(close):
+    matrix = CorrelationEngine.from_prices(close.iloc[:50]).matrix()
+    assert np.isnan(matrix.loc['B', 'A']) and np.isnan(matrix.loc['B', 'B'])
+    assert matrix.loc['A', 'A'] == 1.0
+
+
+def test_cluster_order_puts_correlated_symbols_together():
+    rng = np.random.default_rng(1)
+    groups = rng.standard_normal((500, 2))
+    returns = pd.DataFrame({symbol: groups[:, group] + 0.3 * rng.standard_normal(500)
+                            for symbol, group in zip('ABCDEF', [0, 1, 0, 1, 0, 1])})
+    order = list(cluster_order(returns.corr()).index)
+    assert {frozenset(order[:3]), frozenset(order[3:])} == {frozenset('ACE'), frozenset('BDF')}
+
+
+def test_downsample_matrix_averages_blocks():
+    corr = pd.DataFrame(np.arange(16, dtype=float).reshape(4, 4), index=list('ABCD'), columns=list('ABCD'))
+    corr.iloc[0, 0] = np.nan
+    small = downsample_matrix(corr, max_cells=2)
+    assert list(small.index) == ['A..B', 'C..D']
+    np.testing.assert_allclose(small.to_numpy(), [[(1 + 4 + 5) / 3, 4.5], [10.5, 12.5]])
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (EMA, RSI, SMA, VWAP, Bollinger, Crossover, RollingStd, rolling_means, stream,
+                        window_means)
+
+# Every indicator against the pandas expression it replaces, on a random walk
+# with and without NaN bars (single ones and a run of them).
+
+
+def walk(n=600, seed=0, gaps=False):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.standard_normal(n))
+    if gaps:
+        values[[0, 5, 50, 51, 52, 53, 300]] = np.nan
+    return pd.Series(values)
+
+
+@pytest.fixture(params=[False, True], ids=['dense', 'nan'])
+def prices(request):
+    return walk(gaps=request.param)
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('window', [1, 2, 20])
+def test_sma(prices, window):
+    assert_matches(stream(SMA(window), prices), prices.rolling(window).mean())
+
+
+@pytest.mark.parametrize('span', [2, 12, 26])
+def test_ema(prices, span):
+    assert_matches(stream(EMA(span), prices), prices.ewm(span=span, adjust=False).mean())
+
+
+@pytest.mark.parametrize('window', [2, 20])
+def test_rolling_std(prices, window):
+    assert_matches(stream(RollingStd(window), prices), prices.rolling(window).std())
+
+
+def test_rolling_std_far_from_the_first_value():
+    prices = walk(5000) + np.linspace(0, 1e6, 5000)
+    np.testing.assert_allclose(stream(RollingStd(20), prices), prices.rolling(20).std(), rtol=1e-6, equal_nan=True)
+
+
+def test_bollinger(prices):
+    middle, upper, lower = zip(*stream(Bollinger(20, 2.0), prices))
+    mean, std = prices.rolling(20).mean(), prices.rolling(20).std()
+    assert_matches(middle, mean)
+    assert_matches(upper, mean + 2 * std)
+    assert_matches(lower, mean - 2 * std)
+
+
+def test_rsi(prices):
+    change = prices.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    assert_matches(stream(RSI(14), prices), 100 - 100 / (1 + gain / loss))
+
+
+def test_rsi_without_losses():
+    # Flat, then rising: 0 / 0 is undefined, then 100 while there are no losses
+    prices = pd.Series([10.0] * 5 + [11.0, 12.0])
+    rsi = stream(RSI(3), prices)
+    change = prices.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 3, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 3, adjust=False).mean()
+    assert_matches(rsi, 100 - 100 / (1 + gain / loss))
+    assert np.isnan(rsi[1:5]).all() and rsi[5:] == [100.0, 100.0]
+
+
+def test_vwap(prices):
+    rng = np.random.default_rng(1)
+    high, low = prices + rng.random(len(prices)), prices - rng.random(len(prices))
+    volume = pd.Series(rng.integers(1_000, 10_000, len(prices)).astype(float))
+    volume[[10, 11]] = np.nan
+    price_volume = (high + low + prices) / 3 * volume
+    counted = price_volume.notna()
+    expected = price_volume.where(counted, 0).cumsum() / volume.where(counted, 0).cumsum()
+    vwap = VWAP()
+    actual = [vwap.update(*bar) for bar in zip(high, low, prices, volume)]
+    assert_matches(actual, expected)
+
+
+def test_crossover(prices):
+    short, long = prices.rolling(5).mean(), prices.rolling(20).mean()
+    # Compared with the last bar on which both averages existed
+    above = (short > long).where(short.notna() & long.notna())
+    previous = above.ffill().shift()
+    expected = (above - previous).where(above.notna() & previous.notna(), 0).astype(int)
+    actual = stream(Crossover(5, 20), prices)
+    assert (np.array(actual) == expected.to_numpy()).all()
+    assert set(actual) == {-1, 0, 1}
+
+
+def test_rolling_means(prices):
+    windows = [1, 5, 20, 600, 700]
+    result = rolling_means(prices, windows)
+    assert list(result.columns) == windows
+    for window in windows:
+        assert_matches(result[window], prices.rolling(window).mean())
+
+
+def test_window_means():
+    frame = pd.DataFrame({symbol: walk(seed=seed, gaps=seed % 2 == 1) for seed, symbol in enumerate('ABC')})
+    windows = [1, 10, 50]
+    result = window_means(frame.to_numpy(), windows)
+    assert result.shape == (len(windows),) + frame.shape
+    for i, window in enumerate(windows):
+        assert_matches(result[i], frame.rolling(window).mean())
@@ -0,0 +1,175 @@
+import pandas as pd
+import pytest
+
+from fakes import FakePriceSource
+from price_store import PriceRequests, PriceStore, merge_ranges, missing_ranges
+
+D = pd.Timestamp
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingSource(FakePriceSource):
+    # FakePriceSource that remembers the ranges it was asked for.
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def download(self, symbol, start, end):
+        self.requests.append((symbol, D(start), D(end)))
+        return super().download(symbol, start, end)
+
+
+@pytest.fixture
+def source():
+    return RecordingSource()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path, source, clock):
+    return PriceStore(cache_dir=str(tmp_path), downloader=source.download, clock=clock)
+
+
+def test_merge_ranges_joins_overlapping_and_touching():
+    ranges = [(D('2020-03-01'), D('2020-04-01')), (D('2020-01-01'), D('2020-02-01')),
+              (D('2020-02-01'), D('2020-02-15')), (D('2020-03-15'), D('2020-03-20'))]
+    assert merge_ranges(ranges) == [(D('2020-01-01'), D('2020-02-15')), (D('2020-03-01'), D('2020-04-01'))]
+    assert merge_ranges([]) == []
+
+
+def test_missing_ranges():
+    covered = [(D('2020-02-01'), D('2020-03-01')), (D('2020-04-01'), D('2020-05-01'))]
+    assert missing_ranges(D('2020-01-01'), D('2020-06-01'), covered) == [
+        (D('2020-01-01'), D('2020-02-01')), (D('2020-03-01'), D('2020-04-01')), (D('2020-05-01'), D('2020-06-01'))]
+    assert missing_ranges(D('2020-02-10'), D('2020-02-20'), covered) == []
+    assert missing_ranges(D('2020-02-10'), D('2020-03-10'), covered) == [(D('2020-03-01'), D('2020-03-10'))]
+    assert missing_ranges(D('2020-01-01'), D('2020-01-10'), []) == [(D('2020-01-01'), D('2020-01-10'))]
+
+
+def test_get_matches_the_downloader(store, source):
+    data = store.get('AAA', '2020-01-01', '2020-03-01')
+    expected = source.bars('AAA', '2020-01-01', '2020-03-01')
+    assert list(data.columns) == ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+    assert (data.index == expected.index).all()
+    pd.testing.assert_series_equal(data['Close'], expected['Close'], check_dtype=False, check_names=False, rtol=1e-6)
+    assert (data['Volume'].to_numpy() == expected['Volume'].to_numpy()).all()
+
+
+def test_only_missing_pieces_are_downloaded(store, source):
+    store.get('AAA', '2020-02-01', '2020-03-01')
+    store.get('AAA', '2020-01-01', '2020-04-01')
+    assert source.requests == [('AAA', D('2020-02-01'), D('2020-03-01')),
+                               ('AAA', D('2020-01-01'), D('2020-02-01')),
+                               ('AAA', D('2020-03-01'), D('2020-04-01'))]
+    data = store.get('AAA', '2020-01-15', '2020-03-15')
+    assert len(source.requests) == 3
+    assert store.hits == 1 and store.misses == 2
+    assert len(data) == len(source.bars('AAA', '2020-01-15', '2020-03-15'))
+
+
+def test_empty_download_is_not_marked_covered(tmp_path, source):
+    calls = []
+
+    def flaky(symbol, start, end):
+        calls.append((symbol, start, end))
+        return pd.DataFrame() if len(calls) == 1 else source.download(symbol, start, end)
+
+    store = PriceStore(cache_dir=str(tmp_path), downloader=flaky)
+    assert len(store.get('AAA', '2020-01-01', '2021-01-01')) == 0
+    assert store.missing('AAA', '2020-01-01', '2021-01-01') == [(D('2020-01-01'), D('2021-01-01'))]
+    assert len(store.get('AAA', '2020-01-01', '2021-01-01')) == 262
+    assert len(calls) == 2
+
+
+def test_empty_short_range_is_covered(store, source):
+    # A weekend has no bars; that is not a failed download
+    assert len(store.get('AAA', '2020-01-04', '2020-01-06')) == 0
+    store.get('AAA', '2020-01-04', '2020-01-06')
+    assert len(source.requests) == 1
+
+
+def test_evict_by_age(store, clock):
+    store.max_age = 100
+    store.get('OLD', '2020-01-01', '2020-02-01')
+    clock.now += 60
+    store.get('NEW', '2020-01-01', '2020-02-01')
+    clock.now += 60
+    assert store.evict() == ['OLD']
+    assert store.missing('OLD', '2020-01-01', '2020-02-01')
+    assert not store.missing('NEW', '2020-01-01', '2020-02-01')
+
+
+def test_evict_by_size_drops_least_recently_used(store, clock):
+    for symbol in ['AAA', 'BBB', 'CCC']:
+        store.get(symbol, '2020-01-01', '2020-02-01')
+        clock.now += 1
+    store.get('AAA', '2020-01-01', '2020-02-01')    # AAA is now the most recently used
+    store.max_bytes = store.size() * 2 // 3
+    assert store.evict() == ['BBB']
+    assert store.size() <= store.max_bytes
+    assert not store.missing('AAA', '2020-01-01', '2020-02-01')
+
+
+class BatchSource(RecordingSource):
+    def download_batch(self, symbols, start, end):
+        self.requests.append((list(symbols), D(start), D(end)))
+        return {symbol: self.bars(symbol, start, end) for symbol in symbols}
+
+
+def test_requests_merge_overlapping_ranges_of_a_symbol(store, source):
+    requests = PriceRequests(store)
+    requests.add('chart', 'AAA', '2020-01-01', '2020-03-01')
+    requests.add('analysis', 'AAA', '2020-02-01', '2020-04-01')
+    requests.fetch()
+    assert source.requests == [('AAA', D('2020-01-01'), D('2020-04-01'))]
+    assert requests.saved == 1 and requests.fetches == 1 and requests.misses == 1
+    assert (requests['chart'].index == source.bars('AAA', '2020-01-01', '2020-03-01').index).all()
+    assert (requests['analysis'].index == source.bars('AAA', '2020-02-01', '2020-04-01').index).all()
+
+
+def test_requests_count_no_saving_when_everything_is_stored(store, source):
+    store.get('AAA', '2020-01-01', '2020-04-01')
+    requests = PriceRequests(store)
+    requests.add('chart', 'AAA', '2020-01-01', '2020-03-01')
+    requests.add('analysis', 'AAA', '2020-02-01', '2020-04-01')
+    requests.fetch()
+    assert len(source.requests) == 1
+    assert requests.saved == 0 and requests.fetches == 0 and requests.hits == 1
+
+
+def test_requests_download_missing_symbols_in_one_batch(tmp_path):
+    source = BatchSource()
+    store = PriceStore(cache_dir=str(tmp_path), downloader=source.download)
+    store.get('CCC', '2020-01-01', '2020-06-01')
+    requests = PriceRequests(store, source.download_batch)
+    requests.add('chart', 'AAA', '2020-01-01', '2020-03-01')
+    requests.add('analysis', 'BBB', '2020-02-01', '2020-04-01')
+    requests.add('stored', 'CCC', '2020-01-01', '2020-06-01')
+    requests.fetch()
+    assert source.requests[1:] == [(['AAA', 'BBB'], D('2020-01-01'), D('2020-04-01'))]
+    assert requests.fetches == 1 and requests.saved == 1
+    assert (requests['analysis'].index == source.bars('BBB', '2020-02-01', '2020-04-01').index).all()
+    assert not store.missing('AAA', '2020-01-01', '2020-04-01')
+
+
+def test_requests_fall_back_to_single_downloads(tmp_path):
+    source = BatchSource()
+    store = PriceStore(cache_dir=str(tmp_path), downloader=source.download)
+    requests = PriceRequests(store, lambda symbols, start, end: {'AAA': source.bars('AAA', start, end)})
+    requests.add('chart', 'AAA', '2020-01-01', '2020-03-01')
+    requests.add('analysis', 'BBB', '2020-01-01', '2020-03-01')
+    requests.fetch()
+    assert source.requests == [('BBB', D('2020-01-01'), D('2020-03-01'))]
+    assert len(requests['analysis']) == len(source.bars('BBB', '2020-01-01', '2020-03-01'))
+    assert requests.fetches == 2 and requests.saved == 0
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import shared_cache
+from fakes import FakePriceSource
+from shared_cache import (DEFAULT_TTL, DOWNLOAD_TTL, LIVE_TTL, RETRY_TTL, FileBackend, SharedCache, SQLiteBackend,
+                          download_complete, download_ttl, market_ttl)
+
+NY = 'America/New_York'
+
+
+class RecordingBackend(SQLiteBackend):
+    # SQLiteBackend that remembers the ttl of every set.
+    def __init__(self, path):
+        super().__init__(path)
+        self.ttls = {}
+
+    def set(self, key, value, ttl=None):
+        self.ttls[key] = ttl
+        super().set(key, value, ttl)
+
+
+@pytest.fixture(params=['sqlite', 'files'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'shared.sqlite'), max_bytes=10_000)
+    return FileBackend(str(tmp_path / 'shared'), max_bytes=10_000)
+
+
+def test_backend_operations(backend):
+    assert backend.get('a') is None
+    backend.set('a', b'1')
+    assert backend.get('a') == b'1'
+    assert not backend.add('a', b'2', 60)
+    assert backend.add('b', b'2', 60)
+    backend.delete('b', b'other')
+    assert backend.get('b') == b'2'
+    backend.delete('b', b'2')
+    assert backend.get('b') is None
+    backend.set('c', b'3', -1)
+    assert backend.get('c') is None
+    assert backend.add('c', b'4', 60)
+
+
+def test_backend_drops_oldest_entries_beyond_max_bytes(backend):
+    for i in range(10):
+        backend.set(f'key {i}', bytes(3000))
+        time.sleep(0.01)
+    kept = [i for i in range(10) if backend.get(f'key {i}') is not None]
+    assert kept == [7, 8, 9]
+
+
+def test_expired_file_lock_is_taken_over_once(tmp_path, monkeypatch):
+    # A and B both found the lock expired; A took it over first. B must not
+    # remove A's lock and link its own.
+    backend = FileBackend(str(tmp_path / 'shared'))
+    path = backend._path('lock')
+    os.replace(backend._write_tmp(path, b'dead holder', -1), path)
+    stale = backend._load(path)
+    assert backend.add('lock', b'A', 60)
+    reads, load = iter([stale]), backend._load
+    monkeypatch.setattr(backend, '_load', lambda path: next(reads, None) or load(path))
+    assert not backend.add('lock', b'B', 60)
+    assert backend.get('lock') == b'A'
+    backend.delete('lock', b'B')
+    assert backend.get('lock') == b'A'
+
+
+def test_market_ttl():
+    now = pd.Timestamp('2024-03-13 11:00', tz=NY)     # a Wednesday, market open
+    assert market_ttl('2024-03-13', now) is None
+    assert market_ttl('2024-03-14', now) == LIVE_TTL
+    assert market_ttl('2024-03-14', pd.Timestamp('2024-03-13 08:00', tz=NY)) == 5400
+    assert market_ttl('2024-03-16', pd.Timestamp('2024-03-15 17:00', tz=NY)) == (2 * 24 + 16.5) * 3600
+    assert download_ttl(['A'], '2020-01-01', '2021-01-01') == DOWNLOAD_TTL
+
+
+def test_values_without_ttl_get_the_default(tmp_path):
+    backend = RecordingBackend(str(tmp_path / 'shared.sqlite'))
+    SharedCache(backend).get_or_fetch('key', lambda: 'value')
+    assert backend.ttls == {'key': DEFAULT_TTL}
+
+
+def test_empty_and_partial_results_are_kept_briefly(tmp_path):
+    backend = RecordingBackend(str(tmp_path / 'shared.sqlite'))
+    cache = SharedCache(backend)
+    source = FakePriceSource()
+    download = cache.memoize('prices', lambda *args: pd.DataFrame(), ttl=3600)
+    download('AAA', '2020-01-01', '2021-01-01')
+    batch = cache.memoize('batches', lambda symbols, start, end: source.download_batch(symbols[:1], start, end),
+                          ttl=3600, complete=download_complete)
+    batch(('AAA', 'BBB'), '2020-01-01', '2021-01-01')
+    full = cache.memoize('full', source.download_batch, ttl=3600, complete=download_complete)
+    full(('AAA', 'BBB'), '2020-01-01', '2021-01-01')
+    assert sorted(backend.ttls.values()) == [RETRY_TTL, RETRY_TTL, 3600]
+
+
+def test_failed_result_is_fetched_again_once_its_retry_ttl_passed(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, 'RETRY_TTL', 0)
+    source = FakePriceSource()
+    calls = []
+
+    def flaky(symbol, start, end):
+        # yfinance reports a failed download as an empty frame
+        calls.append(symbol)
+        return pd.DataFrame() if len(calls) == 1 else source.download(symbol, start, end)
+
+    download = SharedCache(SQLiteBackend(str(tmp_path / 'shared.sqlite'))).memoize('prices', flaky)
+    assert len(download('AAA', '2020-01-01', '2021-01-01')) == 0
+    assert len(download('AAA', '2020-01-01', '2021-01-01')) == 262
+    assert len(download('AAA', '2020-01-01', '2021-01-01')) == 262
+    assert len(calls) == 2
+
+
+def test_single_flight(backend):
+    source = FakePriceSource(latency=0.2)
+    download = SharedCache(backend).memoize('prices', source.download)
+    threads = [threading.Thread(target=download, args=('AAA', '2023-01-01', '2023-02-01')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert source.calls == 1
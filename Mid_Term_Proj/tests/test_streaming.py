@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fakes import FakePriceSource
+from streaming import BAR_COLUMNS, ReplaySource, RingBuffer, Streamer
+
+
+def recorded_bars(count):
+    return FakePriceSource().bars('AAA', '2000-01-01', '2100-01-01').iloc[:count]
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+class EndlessSource:
+    # A new bar every `seconds`, forever.
+    def __init__(self, seconds=0.01):
+        self.seconds = seconds
+        self.yielded = 0
+
+    async def bars(self, symbol):
+        bars = recorded_bars(10_000)
+        while True:
+            yield bars.iloc[self.yielded:self.yielded + 1]
+            self.yielded += 1
+            await asyncio.sleep(self.seconds)
+
+
+class FailingSource:
+    async def bars(self, symbol):
+        yield recorded_bars(3)
+        raise ConnectionError('lost connection')
+
+
+def test_ring_buffer_returns_only_new_bars():
+    bars = recorded_bars(10)
+    buffer = RingBuffer(capacity=8)
+    buffer.append(bars.iloc[:3])
+    new, seen = buffer.since(0)
+    assert seen == 3
+    pd.testing.assert_frame_equal(new, bars.iloc[:3][BAR_COLUMNS].astype(float), check_freq=False)
+    buffer.append(bars.iloc[3:5])
+    buffer.append(bars.iloc[:0])
+    new, seen = buffer.since(seen)
+    assert seen == 5 and list(new.index) == list(bars.index[3:5])
+    assert buffer.since(seen)[0].empty
+
+
+def test_ring_buffer_wraps_around():
+    bars = recorded_bars(20)
+    buffer = RingBuffer(capacity=8)
+    for start in range(0, 20, 3):
+        buffer.append(bars.iloc[start:start + 3])
+    new, total = buffer.since(0)
+    assert total == 20
+    assert list(new.index) == list(bars.index[12:])
+    np.testing.assert_array_equal(new['Close'], bars['Close'].iloc[12:])
+
+
+def test_since_after_the_buffer_overflowed():
+    # A reader that fell more than capacity bars behind gets what is left.
+    bars = recorded_bars(30)
+    buffer = RingBuffer(capacity=8)
+    buffer.append(bars.iloc[:5])
+    seen = buffer.since(0)[1]
+    buffer.append(bars.iloc[5:30])       # longer than the buffer: only the last 8 are kept
+    new, seen = buffer.since(seen)
+    assert seen == 30
+    assert list(new.index) == list(bars.index[22:])
+
+
+def test_replay_at_full_speed_delivers_every_bar_in_order():
+    bars = recorded_bars(5000)
+    streamer = Streamer(ReplaySource(bars, speed=float('inf')), 'AAA', capacity=10_000).start()
+    wait_until(lambda: streamer.done)
+    assert streamer.error is None and not streamer.expired
+    new, total = streamer.poll(0)
+    assert total == len(bars)
+    assert new.index.equals(pd.DatetimeIndex(bars.index, name='Date'))
+    np.testing.assert_array_equal(new['Close'], bars['Close'])
+
+
+def test_replay_cuts_long_gaps():
+    bars = recorded_bars(20)
+    source = ReplaySource(bars, speed=1.0, max_gap=0.01)
+    streamer = Streamer(source, 'AAA').start()
+    wait_until(lambda: streamer.done, timeout=5)
+    assert streamer.buffer.total == 20
+
+
+def test_source_errors_are_kept():
+    streamer = Streamer(FailingSource(), 'AAA').start()
+    wait_until(lambda: streamer.done)
+    assert isinstance(streamer.error, ConnectionError)
+    assert streamer.buffer.total == 3
+
+
+def test_producer_nobody_polls_expires():
+    source = EndlessSource()
+    streamer = Streamer(source, 'AAA', lease=0.2).start()
+    wait_until(lambda: streamer.done, timeout=5)
+    assert streamer.expired
+    yielded = source.yielded
+    time.sleep(0.1)
+    assert source.yielded == yielded        # the feed was cancelled
+
+
+def test_polling_renews_the_lease():
+    streamer = Streamer(EndlessSource(), 'AAA', lease=0.2).start()
+    seen = 0
+    deadline = time.monotonic() + 0.6
+    while time.monotonic() < deadline:
+        seen = streamer.poll(seen)[1]
+        time.sleep(0.02)
+    assert not streamer.done and not streamer.expired
+    streamer.stop()
+    wait_until(lambda: streamer.done)
+    assert not streamer.expired
@@ -0,0 +1,31 @@
+import pytest
+
+from compact import CATEGORY_COLUMNS, compact_constituents
+from fakes import fake_constituents
+from tables import TableStore
+
+
+@pytest.fixture
+def store():
+    return TableStore(compact_constituents(fake_constituents()))
+
+
+@pytest.mark.parametrize('column', CATEGORY_COLUMNS)
+def test_sort_by_categorical_column(store, column):
+    rows, total = store.page(0, page_rows=500, sort_by=column)
+    assert total == 500
+    assert list(rows[column]) == sorted(rows[column])
+
+
+def test_filter_and_sort_descending(store):
+    rows, total = store.page(0, page_rows=500, sort_by='GICS Sector', descending=True,
+                             filter_column='GICS Sector', filter_text='energy')
+    assert total == len(rows) == 46
+    assert set(rows['GICS Sector']) == {'Energy'}
+
+
+def test_pages_and_columns(store):
+    rows, total = store.page(2, page_rows=50, columns=['Symbol', 'GICS Sector'])
+    assert total == 500
+    assert list(rows.columns) == ['Symbol', 'GICS Sector']
+    assert list(rows['Symbol']) == [f'S{i:03d}' for i in range(100, 150)]
@@ -1,19 +1,16 @@
-import streamlit as st
-import seaborn as sns
-import pandas as pd
-from sklearn.datasets import load_wine
-import altair as alt
-wine_data = load_wine()
-labels = wine_data.feature_names
-targets = wine_data.target
-print(labels)
-df_form = pd.DataFrame(wine_data.data, columns = labels)
-df_form['targets'] = targets
-st.write("""
-# Italian Wine Dataset
-How are malic acid and alcohol correlated in Italian wines?
-""")
-alt_handle = alt.Chart(df_form).mark_circle(size=60).encode(x='alcohol', y='malic_acid',
-    color='hue', tooltip=['ash', 'magnesium',
-    'proanthocyanins']).interactive()
-st.altair_chart(alt_handle)
\ No newline at end of file
+import os
+import sys
+import streamlit as st
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from explorer_data import SAMPLE_SIZES, altair_scatter, features, sample_label
+
+labels = features('wine')
+x = st.sidebar.selectbox('X axis', labels, index=labels.index('alcohol'))
+y = st.sidebar.selectbox('Y axis', labels, index=labels.index('malic_acid'))
+color = st.sidebar.selectbox('Color', labels + ['targets'], index=labels.index('hue'))
+rows = st.sidebar.selectbox('Rows', SAMPLE_SIZES, format_func=sample_label)
+st.write(f"""
+# Italian Wine Dataset
+How are {y.replace('_', ' ')} and {x.replace('_', ' ')} correlated in Italian wines?
+""")
+st.vega_lite_chart(altair_scatter('wine', rows, x, y, color, ('ash', 'magnesium', 'proanthocyanins')))
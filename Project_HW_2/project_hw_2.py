@@ -1,20 +1,27 @@
-import streamlit as st
-import seaborn as sns
-import pandas as pd
-import plotly.express as px  # Import Plotly Express for 3D scatter plot
-
-# Load the iris dataset from Seaborn
-iris_data = sns.load_dataset('iris')
-
-# Update the text to describe the iris dataset
-st.write("""
-# Iris Dataset
-This dataset contains information about different species of iris flowers.
-""")
-
-# Create a 3D scatter plot using Plotly Express
-fig = px.scatter_3d(iris_data, x='sepal_length', y='sepal_width', z='petal_length',
-                    color='species', size='petal_width', title='Iris Dataset 3D Scatter Plot')
-
-# Show the plot in the Streamlit app
-st.plotly_chart(fig)
\ No newline at end of file
+import os
+import sys
+import streamlit as st
+# Shared, cached loaders and charts of the dataset explorers (bundled iris data, no download)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from explorer_data import SAMPLE_SIZES, features, sample_label, scatter_3d
+
+# Let the user pick what each axis, the color and the marker size show
+measures = features('iris')
+x = st.sidebar.selectbox('X axis', measures, index=0)
+y = st.sidebar.selectbox('Y axis', measures, index=1)
+z = st.sidebar.selectbox('Z axis', measures, index=2)
+color = st.sidebar.selectbox('Color', ['species'] + measures)
+size = st.sidebar.selectbox('Size', measures, index=3)
+rows = st.sidebar.selectbox('Rows', SAMPLE_SIZES, format_func=sample_label)
+
+# Update the text to describe the iris dataset
+st.write("""
+# Iris Dataset
+This dataset contains information about different species of iris flowers.
+""")
+
+# Create a 3D scatter plot using Plotly Express (built once per choice of encodings)
+fig = scatter_3d('iris', rows, x, y, z, color, size, 'Iris Dataset 3D Scatter Plot')
+
+# Show the plot in the Streamlit app
+st.plotly_chart(fig)
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Datasets and charts shared by the wine (Project_HW_1) and iris (Project_HW_2)
+# explorers. Both datasets ship as CSV files in data/ (copies of the ones in
+# scikit-learn), so a cold start needs no network, where seaborn downloads
+# iris, and none of the slow sklearn or seaborn imports. Altair and Plotly are
+# imported when a chart is first built.
+# Frames and chart specs are memoized for every session of the server; specs
+# are keyed by the dataset, its size and the encoding choices.
+#
+# For demos and load tests a dataset can be grown to any number of rows by
+# resampling its rows with a little noise. A chart then draws a random sample
+# of at most its point budget: Vega-Lite draws every point as its own mark,
+# Plotly's 3-D scatter is WebGL and stays interactive with far more.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DATASETS = {'wine': ('wine.csv', 'targets'), 'iris': ('iris.csv', 'species')}
+SAMPLE_SIZES = [None, 10_000, 100_000, 1_000_000]   # None: the dataset as it is
+ALTAIR_POINTS = 5_000       # also Altair's default row limit
+WEBGL_POINTS = 20_000
+JITTER = 0.05               # noise of resampled rows, in standard deviations of each column
+DECIMALS = 3                # charted values are rounded to this, to keep the specs small
+
+
+def sample_label(rows):
+    return f'{rows:,} resampled' if rows else 'original'
+
+
+@st.cache_data(show_spinner=False)
+def load_dataset(name):
+    filename, label = DATASETS[name]
+    data = pd.read_csv(os.path.join(DATA_DIR, filename))
+    if data[label].dtype == object:
+        data[label] = data[label].astype('category')
+    return data
+
+
+def features(name):
+    # Numeric columns, the ones a chart can put on an axis.
+    data = load_dataset(name)
+    return [column for column in data.columns if column != DATASETS[name][1]]
+
+
+def resample(data, rows, label, seed=0):
+    # rows rows drawn from data with replacement, measurements jittered with
+    # float32 noise. Measurements stay non-negative.
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(data), rows)
+    numeric = [column for column in data.columns if column != label]
+    values = data[numeric].to_numpy(dtype=np.float32)
+    scale = JITTER * values.std(axis=0)
+    noisy = values[picks] + rng.standard_normal((rows, len(numeric)), dtype=np.float32) * scale
+    out = pd.DataFrame(np.maximum(noisy, 0), columns=numeric)
+    out[label] = data[label].to_numpy()[picks]
+    return out[list(data.columns)]
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def sampled(name, rows):
+    # The dataset grown to rows rows, or as it is for None. Shared, not copied
+    # per call like st.cache_data results: callers must not modify it.
+    data = load_dataset(name)
+    return data if rows is None else resample(data, rows, DATASETS[name][1])
+
+
+def point_sample(data, budget, seed=0):
+    # At most budget rows, chosen at random in their original order.
+    if len(data) <= budget:
+        return data
+    return data.sample(budget, random_state=seed).sort_index()
+
+
+def chart_points(name, rows, budget, columns):
+    # The rows a chart draws, only the columns it encodes. Measurements are
+    # float64 rounded to DECIMALS: float32 values would be written to the
+    # spec with all their spurious digits.
+    data = point_sample(sampled(name, rows), budget)[list(dict.fromkeys(columns))]
+    numeric = [column for column in data.columns if column in features(name)]
+    return data.astype({column: float for column in numeric}).round({column: DECIMALS for column in numeric})
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def altair_scatter(name, rows, x, y, color, tooltip):
+    # Vega-Lite spec of an interactive scatter of y against x, for st.vega_lite_chart.
+    import altair as alt
+    data = chart_points(name, rows, ALTAIR_POINTS, [x, y, color, *tooltip])
+    chart = alt.Chart(data).mark_circle(size=60).encode(x=x, y=y, color=color, tooltip=list(tooltip)).interactive()
+    return chart.to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def scatter_3d(name, rows, x, y, z, color, size, title):
+    # Plotly 3-D (WebGL) scatter.
+    import plotly.express as px
+    data = chart_points(name, rows, WEBGL_POINTS, [x, y, z, color, size])
+    return px.scatter_3d(data, x=x, y=y, z=z, color=color, size=size, title=title)